@@ -0,0 +1,168 @@
+# pip install pillow numpy # 本程序所需插件
+# ----------------------------------------
+# 离线烘焙噪声高度图：
+# 代替 MapGenerator.generateHeightMapFromNoise 在运行时做的工作
+# （加载 Noise.png -> OffscreenCanvas -> getImageData -> 双线性采样 -> 排序求阈值）
+# 输出文件格式（小端）：
+#   0   char[4]  magic "HXNH"
+#   4   uint16   版本号
+#   6   uint16   数据格式（0: Float32, 1: Uint8，值 = 高度 * 255）
+#   8   uint32   地图宽度
+#   12  uint32   地图高度
+#   16  float32  oceanRatio
+#   20  float32  mountainRatio
+#   24  float32  height1 ~ height4（heightThresholds，取值 0~1）
+#   40  高度平面（按 y * width + x 排列，与 NoiseTextureLoader.generateNoiseMap 一致）
+# 头部 40 字节，前端可直接 new Float32Array(buffer, 40, width * height)
+# ----------------------------------------
+import os
+import struct
+import time
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"HXNH"
+VERSION = 1
+FORMAT_FLOAT32 = 0
+FORMAT_UINT8 = 1
+HEADER_STRUCT = struct.Struct("<4sHHIIffffff")
+
+# 默认参数与 ServiceManager 中的 mapInfo 保持一致
+DEFAULT_OCEAN_RATIO = 0.3
+DEFAULT_MOUNTAIN_RATIO = 0.15
+
+
+def load_gray(noise_path):
+    """读取噪声图，返回灰度数组（(r + g + b) / (3 * 255)，与 NoiseTextureLoader.getGrayValue 一致）"""
+    rgb = np.asarray(Image.open(noise_path).convert("RGB"), dtype=np.float32)
+    return rgb.sum(axis=2) / (3 * 255)
+
+
+def sample_noise(gray, width, height):
+    """
+    按地图尺寸对噪声图做双线性采样（向量化版的 NoiseTextureLoader.generateNoiseMap）
+    :param gray: 灰度数组（噪声图高 x 噪声图宽）
+    :return: Float32 数组（height x width）
+    """
+    noise_height, noise_width = gray.shape
+    uv_x = np.arange(width, dtype=np.float64) / width * (noise_width - 1)
+    uv_y = np.arange(height, dtype=np.float64) / height * (noise_height - 1)
+
+    x1 = np.floor(uv_x).astype(np.intp)
+    y1 = np.floor(uv_y).astype(np.intp)
+    # uv 最大值小于 (尺寸 - 1)，x1 + 1 不会越界；这里仍做保护以兼容 1 像素的噪声图
+    x2 = np.minimum(x1 + 1, noise_width - 1)
+    y2 = np.minimum(y1 + 1, noise_height - 1)
+    rx = (uv_x - x1)[np.newaxis, :]
+    ry = (uv_y - y1)[:, np.newaxis]
+
+    q11 = gray[np.ix_(y1, x1)]
+    q21 = gray[np.ix_(y1, x2)]
+    q12 = gray[np.ix_(y2, x1)]
+    q22 = gray[np.ix_(y2, x2)]
+    r1 = q11 + (q21 - q11) * rx
+    r2 = q12 + (q22 - q12) * rx
+    return (r1 + (r2 - r1) * ry).astype(np.float32)
+
+
+def compute_thresholds(heights, ocean_ratio, mountain_ratio):
+    """
+    计算高度等级阈值（与 generateHeightMapFromNoise 的排序取值一致，用 np.partition 代替完整排序）
+    :return: (height1, height2, height3, height4)
+    """
+    flat = heights.ravel()
+    n = flat.size
+    k1 = min(int(np.floor(n * ocean_ratio)), n - 1)
+    k4 = min(int(np.floor(n * (1 - mountain_ratio))), n - 1)
+    partitioned = np.partition(flat, (k1, k4))
+    height1 = float(partitioned[k1])
+    height4 = float(partitioned[k4])
+    height2 = height1 + (height4 - height1) * 0.33
+    height3 = height1 + (height4 - height1) * 0.66
+    return height1, height2, height3, height4
+
+
+def bake_noise_height(noise_path, width, height, ocean_ratio=DEFAULT_OCEAN_RATIO,
+                      mountain_ratio=DEFAULT_MOUNTAIN_RATIO, data_format=FORMAT_FLOAT32):
+    """
+    烘焙高度平面与阈值
+    :return: (文件字节, 高度数组, 阈值元组)
+    """
+    heights = sample_noise(load_gray(noise_path), width, height)
+    thresholds = compute_thresholds(heights, ocean_ratio, mountain_ratio)
+
+    if data_format == FORMAT_UINT8:
+        plane = np.rint(heights * 255).astype(np.uint8)
+    else:
+        plane = heights.astype("<f4")
+
+    header = HEADER_STRUCT.pack(MAGIC, VERSION, data_format, width, height,
+                                ocean_ratio, mountain_ratio, *thresholds)
+    return header + plane.tobytes(), heights, thresholds
+
+
+def read_baked_height(file_path):
+    """读取烘焙文件，返回 (头部字典, 高度数组（0~1）)"""
+    with open(file_path, "rb") as f:
+        blob = f.read()
+    magic, version, data_format, width, height, ocean_ratio, mountain_ratio, h1, h2, h3, h4 = \
+        HEADER_STRUCT.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("不是烘焙高度图文件")
+    if data_format == FORMAT_UINT8:
+        plane = np.frombuffer(blob, np.uint8, width * height, HEADER_STRUCT.size).astype(np.float32) / 255
+    else:
+        plane = np.frombuffer(blob, "<f4", width * height, HEADER_STRUCT.size)
+    header = {
+        "version": version,
+        "format": data_format,
+        "width": width,
+        "height": height,
+        "oceanRatio": ocean_ratio,
+        "mountainRatio": mountain_ratio,
+        "thresholds": (h1, h2, h3, h4),
+    }
+    return header, plane.reshape(height, width)
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_noise = os.path.normpath(os.path.join(script_dir, "..", "..", "public", "Noise.png"))
+
+    noise_path = input(f"请输入噪声图路径（默认 {default_noise}，直接回车使用默认值）：").strip() or default_noise
+    if not os.path.exists(noise_path):
+        print(f"噪声图 {noise_path} 不存在！")
+        return
+
+    size_input = input("请输入地图尺寸（格式：宽度*高度，默认 20*20）：").strip() or "20*20"
+    width, height = map(int, size_input.split("*"))
+
+    ocean_ratio = input(f"请输入海洋占比 oceanRatio（默认 {DEFAULT_OCEAN_RATIO}）：").strip()
+    ocean_ratio = float(ocean_ratio) if ocean_ratio else DEFAULT_OCEAN_RATIO
+    mountain_ratio = input(f"请输入山地占比 mountainRatio（默认 {DEFAULT_MOUNTAIN_RATIO}）：").strip()
+    mountain_ratio = float(mountain_ratio) if mountain_ratio else DEFAULT_MOUNTAIN_RATIO
+
+    data_format = input("请选择数据格式（0: Float32, 1: Uint8，默认 0）：").strip()
+    data_format = int(data_format) if data_format else FORMAT_FLOAT32
+
+    start = time.perf_counter()
+    blob, heights, thresholds = bake_noise_height(noise_path, width, height, ocean_ratio, mountain_ratio, data_format)
+    elapsed = time.perf_counter() - start
+
+    output_file = os.path.join(os.path.dirname(noise_path), f"noise_height_{width}x{height}.bin")
+    with open(output_file, "wb") as f:
+        f.write(blob)
+
+    print("\n=== 烘焙结果 ===")
+    print(f"地图尺寸: {width} x {height}, 数据格式: {'Uint8' if data_format == FORMAT_UINT8 else 'Float32'}")
+    print(f"高度范围: {heights.min():.4f} ~ {heights.max():.4f}")
+    print("高度阈值: " + ", ".join(f"height{i + 1}={t:.4f}" for i, t in enumerate(thresholds)))
+    print(f"文件大小: {len(blob)} 字节, 耗时: {elapsed * 1000:.1f} ms")
+    print(f"已保存到: {output_file}")
+
+    input("\n已结束，回车可关闭窗口")
+
+
+if __name__ == "__main__":
+    main()
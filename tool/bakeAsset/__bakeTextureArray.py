@@ -0,0 +1,196 @@
+# pip install pillow numpy # 本程序所需插件
+# ----------------------------------------
+# 离线预处理地形纹理数组：
+# 将 Terrain Texture Array.png 图集切成各层，离线生成完整的 mip 链，
+# 打包为一个原始 RGBA 容器，渲染端可直接按层级上传（texImage3D），无需解码 PNG 和生成 mipmap
+# 输出文件格式（小端）：
+#   0   char[4]  magic "HXTA"
+#   4   uint16   版本号
+#   6   uint16   像素格式（0: RGBA8）
+#   8   uint32   层数 layers
+#   12  uint32   第 0 级宽度
+#   16  uint32   第 0 级高度
+#   20  uint32   mip 级数 levels
+#   24  每级一条记录：uint32 偏移, uint32 字节数, uint32 宽, uint32 高（共 levels 条）
+#   ..  各级数据：每级内按层连续存放（layers * 宽 * 高 * 4 字节），可整块传给 texImage3D
+# ----------------------------------------
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"HXTA"
+VERSION = 1
+FORMAT_RGBA8 = 0
+HEADER_STRUCT = struct.Struct("<4sHHIIII")
+LEVEL_STRUCT = struct.Struct("<IIII")
+
+FILTERS = ("box", "lanczos")
+
+
+def slice_layers(atlas, layer_count=None):
+    """
+    将图集切成各层
+    :param atlas: RGBA 数组（高 x 宽 x 4）
+    :param layer_count: 层数，为 None 时按正方形图层推断（横向或纵向排列）
+    :return: 数组（层数 x 层高 x 层宽 x 4）
+    """
+    height, width = atlas.shape[:2]
+    if layer_count is None:
+        if width >= height and width % height == 0:
+            layer_count = width // height
+        elif height % width == 0:
+            layer_count = height // width
+        else:
+            raise ValueError(f"无法从 {width}x{height} 推断层数，请手动指定")
+
+    if width >= height:
+        if width % layer_count:
+            raise ValueError(f"宽度 {width} 不能被层数 {layer_count} 整除")
+        layer_width = width // layer_count
+        return atlas.reshape(height, layer_count, layer_width, 4).transpose(1, 0, 2, 3).copy()
+    if height % layer_count:
+        raise ValueError(f"高度 {height} 不能被层数 {layer_count} 整除")
+    return atlas.reshape(layer_count, height // layer_count, width, 4).copy()
+
+
+def _box_downsample(layers):
+    """2x2 盒式滤波（所有层一次完成）；下一级尺寸为 max(1, 尺寸 // 2)，与 WebGL 的 mip 尺寸规则一致"""
+    count, height, width, channels = layers.shape
+    # 尺寸为 1 的维度复制一份，其余奇数尺寸丢弃最后一行/列
+    if height == 1:
+        layers = np.repeat(layers, 2, axis=1)
+    if width == 1:
+        layers = np.repeat(layers, 2, axis=2)
+    new_height, new_width = max(1, height // 2), max(1, width // 2)
+    layers = layers[:, :new_height * 2, :new_width * 2]
+    blocks = layers.astype(np.uint16).reshape(count, new_height, 2, new_width, 2, channels)
+    # +2 用于四舍五入
+    return ((blocks.sum(axis=(2, 4)) + 2) // 4).astype(np.uint8)
+
+
+def _lanczos_downsample(layers):
+    """Lanczos 滤波（PIL），逐层缩小一半"""
+    height, width = layers.shape[1:3]
+    size = (max(1, width // 2), max(1, height // 2))
+    return np.stack([np.asarray(Image.fromarray(layer, "RGBA").resize(size, Image.LANCZOS)) for layer in layers])
+
+
+def build_mip_chain(layers, filter_type="box"):
+    """
+    生成完整 mip 链（直到 1x1）
+    :param layers: 数组（层数 x 高 x 宽 x 4）
+    :param filter_type: box / lanczos
+    :return: 各级数组列表，第 0 级为原图
+    """
+    if filter_type not in FILTERS:
+        raise ValueError(f"未知的滤波方式: {filter_type}，可选: {', '.join(FILTERS)}")
+    downsample = _box_downsample if filter_type == "box" else _lanczos_downsample
+
+    levels = [layers]
+    while levels[-1].shape[1] > 1 or levels[-1].shape[2] > 1:
+        levels.append(downsample(levels[-1]))
+    return levels
+
+
+def pack_texture_array(levels):
+    """将 mip 链打包为容器字节"""
+    layer_count, height, width = levels[0].shape[:3]
+    header = HEADER_STRUCT.pack(MAGIC, VERSION, FORMAT_RGBA8, layer_count, width, height, len(levels))
+
+    offset = HEADER_STRUCT.size + LEVEL_STRUCT.size * len(levels)
+    table = bytearray()
+    for level in levels:
+        table += LEVEL_STRUCT.pack(offset, level.nbytes, level.shape[2], level.shape[1])
+        offset += level.nbytes
+    return header + bytes(table) + b"".join(np.ascontiguousarray(level).tobytes() for level in levels)
+
+
+def read_texture_array(blob):
+    """pack_texture_array 的逆运算，返回 (层数, 各级数组列表)"""
+    magic, _, _, layer_count, _, _, level_count = HEADER_STRUCT.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("不是纹理数组容器文件")
+    levels = []
+    for i in range(level_count):
+        offset, size, width, height = LEVEL_STRUCT.unpack_from(blob, HEADER_STRUCT.size + LEVEL_STRUCT.size * i)
+        levels.append(np.frombuffer(blob, np.uint8, size, offset).reshape(layer_count, height, width, 4))
+    return layer_count, levels
+
+
+def bake_texture_array(atlas_path, layer_count=None, filter_type="box"):
+    """
+    预处理纹理图集
+    :return: (容器字节, 各级数组列表, 统计信息字典)
+    """
+    start = time.perf_counter()
+    atlas = np.asarray(Image.open(atlas_path).convert("RGBA"))
+    decode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layers = slice_layers(atlas, layer_count)
+    levels = build_mip_chain(layers, filter_type)
+    blob = pack_texture_array(levels)
+    bake_seconds = time.perf_counter() - start
+
+    stats = {
+        "png_bytes": os.path.getsize(atlas_path),
+        # 运行时：PNG 解码出完整图集，再切片复制出各层
+        "runtime_decode_bytes": atlas.nbytes * 2,
+        # 运行时：只上传第 0 级，其余层级由 GPU 生成
+        "runtime_upload_bytes": layers.nbytes,
+        "container_bytes": len(blob),
+        "container_zlib_bytes": len(zlib.compress(blob, 6)),
+        "mip_bytes": sum(level.nbytes for level in levels[1:]),
+        "decode_seconds": decode_seconds,
+        "bake_seconds": bake_seconds,
+    }
+    return blob, levels, stats
+
+
+def print_stats(stats, levels):
+    """打印字节统计"""
+    print("\n=== 预处理结果 ===")
+    layer_count, height, width = levels[0].shape[:3]
+    print(f"层数: {layer_count}, 每层: {width}x{height}, mip 级数: {len(levels)}")
+    print(f"PNG 图集: {stats['png_bytes']} 字节（本机解码耗时 {stats['decode_seconds'] * 1000:.1f} ms）")
+    print(f"运行时解码与切片产生的字节: {stats['runtime_decode_bytes']} => 使用容器后为 0")
+    print(f"运行时上传: {stats['runtime_upload_bytes']} 字节 + GPU 生成 mipmap "
+          f"=> 容器直接上传 {stats['runtime_upload_bytes'] + stats['mip_bytes']} 字节（含 {stats['mip_bytes']} 字节 mip）")
+    print(f"容器文件: {stats['container_bytes']} 字节（zlib 后 {stats['container_zlib_bytes']} 字节，"
+          f"为 PNG 的 {stats['container_zlib_bytes'] / stats['png_bytes'] * 100:.1f}%）")
+    print(f"预处理耗时: {stats['bake_seconds'] * 1000:.1f} ms")
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_atlas = os.path.normpath(os.path.join(script_dir, "..", "..", "public", "Terrain Texture Array.png"))
+
+    atlas_path = input(f"请输入纹理图集路径（默认 {default_atlas}，直接回车使用默认值）：").strip() or default_atlas
+    if not os.path.exists(atlas_path):
+        print(f"纹理图集 {atlas_path} 不存在！")
+        return
+
+    layer_count = input("请输入层数（默认按正方形图层自动推断）：").strip()
+    layer_count = int(layer_count) if layer_count else None
+
+    filter_type = input(f"请选择滤波方式（{', '.join(FILTERS)}，默认 box）：").strip() or "box"
+
+    blob, levels, stats = bake_texture_array(atlas_path, layer_count, filter_type)
+
+    base_name, _ = os.path.splitext(atlas_path)
+    output_file = f"{base_name}.texarray"
+    with open(output_file, "wb") as f:
+        f.write(blob)
+
+    print_stats(stats, levels)
+    print(f"已保存到: {output_file}")
+
+    input("\n已结束，回车可关闭窗口")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,157 +1,529 @@
+import hashlib
+import json
 import os
+import re
 import shutil
+import sys
+import tempfile
+import threading
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox
 
 # 定义常量
 IGNORE_EXPORT_MARKER = "//#ignore_export"  # 忽略文件的标识符
+SOURCE_EXTENSIONS = ('.ts', '.tsx', '.css', '.html', '.js')  # 需要处理的源文件类型
+ALL_CODE_NAME = "__src_allCode.txt"  # 合并后的代码文件名
+MANIFEST_NAME = "__manifest.json"  # 增量模式的清单文件名（记录路径、大小、修改时间、内容哈希）
+MANIFEST_VERSION = 2
+DEFAULT_IO_WORKERS = 8  # 并发模式的默认线程数（1 为顺序执行）
+ENV_FILES = ["index.html", "package.json", "tsconfig.json", "vite.config.ts"]  # 功能④需要合并的文件
+ASSET_INDEX_NAME = "__public_assets.json"  # public 资源索引文件名（内容哈希、重复文件、最大文件）
+ASSET_INDEX_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20  # 计算资源哈希时每次读取的字节数
+LARGEST_ASSET_COUNT = 10  # 资源索引中列出的最大文件数量
+DEFAULT_WATCH_INTERVAL = 0.5  # 监视模式的轮询间隔（秒）
+DEFAULT_WATCH_DEBOUNCE = 0.3  # 监视模式的防抖时间（秒）：连续保存合并为一次更新
 
 
 def is_fully_commented(file_path):
-    # 根据文件扩展名确定注释符号
+    # 根据文件扩展名判断，读取文件后交给 is_fully_commented_text
     ext = os.path.splitext(file_path)[1]
-    if ext in ('.ts', '.tsx', '.js'):
-        single_line_comment = '//'
-        multi_line_comment_start = '/*'
-        multi_line_comment_end = '*/'
-    elif ext == '.css':
-        single_line_comment = None
-        multi_line_comment_start = '/*'
-        multi_line_comment_end = '*/'
-    elif ext == '.html':
-        single_line_comment = None
-        multi_line_comment_start = '<!--'
-        multi_line_comment_end = '-->'
-    else:
-        return False  # 不支持的文件类型，默认不跳过
-
     with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    # 检查每一行是否被注释
-    in_multi_line_comment = False
-    for line in lines:
-        stripped_line = line.strip()
-        if not stripped_line:  # 空行跳过
-            continue
-
-        if in_multi_line_comment:
-            if multi_line_comment_end in stripped_line:
-                in_multi_line_comment = False
-            continue
-        elif single_line_comment and stripped_line.startswith(single_line_comment):
-            continue
-        elif stripped_line.startswith(multi_line_comment_start):
-            if multi_line_comment_end not in stripped_line:
-                in_multi_line_comment = True
-            continue
+        return is_fully_commented_text(f.read(), ext)
+
+# ----------------------------------------
+# 注释感知的词法分析器：按 token 顺序扫描，遇到第一个真正的代码 token 即可停止
+# 能正确处理 "*/ 后面跟代码"、字符串中的 "//"、正则字面量等情况
+# ----------------------------------------
+JS_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\r\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<string>"(?:\\[\s\S]|[^"\\\r\n])*"?|'(?:\\[\s\S]|[^'\\\r\n])*'?)
+  | (?P<template>`)
+  | (?P<slash>/)
+  | (?P<code>[^\s/"'`]+)
+""", re.X)
+JS_REGEX_LITERAL = re.compile(r"/(?![*/])(?:\\.|\[(?:\\.|[^\]\\\r\n])*\]|[^/\\\r\n\[])+/[A-Za-z]*")
+# 出现在这些字符或关键字之后的 "/" 是正则字面量的开始，否则是除号
+JS_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+JS_TRAILING_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*$")
+
+CSS_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<string>"(?:\\[\s\S]|[^"\\\r\n])*"?|'(?:\\[\s\S]|[^'\\\r\n])*'?)
+  | (?P<code>[^\s/"']+|/)
+""", re.X)
+
+HTML_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment><!--[\s\S]*?(?:-->|\Z))
+  | (?P<code>[^\s<]+|<)
+""", re.X)
+
+# JSX 中标签之间的文本（如 <a>http://x</a>）不按 JS 词法处理，无法可靠区分注释，这些文件不去除注释
+JSX_EXTENSIONS = ('.tsx', '.jsx')
+
+LEXERS = {
+    '.ts': JS_TOKEN,
+    '.tsx': JS_TOKEN,
+    '.js': JS_TOKEN,
+    '.css': CSS_TOKEN,
+    '.html': HTML_TOKEN,
+}
+
+def _regex_allowed(prev_code):
+    """根据前一个代码 token 判断 "/" 是否为正则字面量的开始"""
+    if not prev_code:
+        return True
+    if prev_code[-1] in JS_REGEX_PRECEDERS:
+        return True
+    # 只有完整的关键字才算（margin、join 等以关键字结尾的标识符之后是除号）
+    identifier = JS_TRAILING_IDENTIFIER.search(prev_code)
+    return identifier is not None and identifier.group() in JS_REGEX_KEYWORDS
+
+def _template_end(text, pos):
+    """从反引号开始扫描模板字符串，返回结束位置；${ } 中的表达式按 JS 词法扫描，可包含字符串、注释和嵌套的模板字符串"""
+    length = len(text)
+    i = pos + 1
+    while i < length:
+        c = text[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            return i + 1
+        elif c == '$' and text.startswith('{', i + 1):
+            i = _template_expression_end(text, i + 2)
         else:
-            return False  # 发现未注释的行
-
-    return True  # 所有行都被注释
+            i += 1
+    return length
+
+def _template_expression_end(text, pos):
+    """扫描 ${ 之后的表达式，返回与之配对的 } 之后的位置（按括号深度配对）"""
+    depth = 0
+    for kind, start, end in tokenize_source(text, '.js', pos):
+        if kind != 'code' or text[start] in '"\'`/':  # 字符串、模板字符串、正则字面量中的括号不计
+            continue
+        for i in range(start, end):
+            if text[i] == '{':
+                depth += 1
+            elif text[i] == '}':
+                if depth == 0:
+                    return i + 1
+                depth -= 1
+    return len(text)
+
+def tokenize_source(text, ext, pos=0):
+    """
+    逐个生成 token，调用方可随时停止
+    :param pos: 开始扫描的位置
+    :return: 生成器，每项为 (类型, 起始位置, 结束位置)，类型为 space / comment / code（字符串归为 code）
+    """
+    pattern = LEXERS[ext]
+    match = pattern.match
+    length = len(text)
+    prev_code = ""
+    while pos < length:
+        m = match(text, pos)
+        kind = m.lastgroup
+        end = m.end()
+        if kind == 'slash':
+            if _regex_allowed(prev_code):
+                literal = JS_REGEX_LITERAL.match(text, pos)
+                if literal:
+                    end = literal.end()
+            kind = 'code'
+        elif kind == 'template':
+            end = _template_end(text, pos)
+            kind = 'code'
+        elif kind == 'string':
+            kind = 'code'
+        if kind == 'code':
+            prev_code = text[pos:end]
+        yield kind, pos, end
+        pos = end
+
+def is_fully_commented_text(text, ext):
+    # 根据文件扩展名选择词法规则
+    if ext not in LEXERS:
+        return False  # 不支持的文件类型，默认不跳过
 
-def flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative, merge_files=False):
+    # 遇到第一个代码 token 即停止
+    for kind, _, _ in tokenize_source(text, ext):
+        if kind == 'code':
+            return False  # 发现未注释的代码
+
+    return True  # 全部为注释或空白
+
+def strip_comments(text, ext):
+    """
+    去除注释（用于减小 __src_allCode.txt），并删除因此变空的行与行尾空白
+    块注释若跨行则替换为换行，否则替换为空格，避免前后两个 token 粘连
+    """
+    if ext not in LEXERS or ext in JSX_EXTENSIONS:
+        return text
+
+    pieces = []
+    for kind, start, end in tokenize_source(text, ext):
+        if kind != 'comment':
+            pieces.append(text[start:end])
+        elif '\n' in text[start:end]:
+            pieces.append('\n')
+        elif not text.startswith('//', start):
+            pieces.append(' ')
+    lines = ''.join(pieces).split('\n')
+    return '\n'.join(line.rstrip() for line in lines if line.strip()) + '\n'
+
+class IOCounter:
+    """统计文件 I/O 次数，用于确认每个文件只读取一次"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # 并发模式下多个线程同时计数
+        self.reset()
+
+    def reset(self):
+        self.dir_scans = 0  # 扫描目录次数
+        self.file_reads = 0  # 打开并读取文件次数
+        self.bytes_read = 0
+        self.file_writes = 0  # 写入文件次数
+        self.bytes_written = 0
+
+    def add(self, reads=0, bytes_read=0, writes=0, bytes_written=0):
+        with self.lock:
+            self.file_reads += reads
+            self.bytes_read += bytes_read
+            self.file_writes += writes
+            self.bytes_written += bytes_written
+
+    def summary(self):
+        return (f"扫描目录 {self.dir_scans} 次, 读取文件 {self.file_reads} 次（{self.bytes_read} 字节）, "
+                f"写入文件 {self.file_writes} 次（{self.bytes_written} 字节）")
+
+io_counter = IOCounter()
+
+def read_file_bytes(file_path):
+    """读取整个文件（计入 io_counter）"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    io_counter.add(reads=1, bytes_read=len(data))
+    return data
+
+def write_file_bytes(file_path, data):
+    """写入整个文件（计入 io_counter）"""
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    io_counter.add(writes=1, bytes_written=len(data))
+
+def map_io(func, items, workers=1):
+    """
+    执行一批 I/O 任务，结果顺序与输入一致（与完成顺序无关）
+    :param workers: 线程数，<= 1 时顺序执行
+    """
+    if workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+def decode_source(data):
+    """按文本模式读取的效果解码：utf-8 + 统一换行符"""
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+def scan_tree(folder, extensions=None, workers=1):
+    """
+    使用 os.scandir 遍历一次目录，同时生成树形结构与文件列表
+    :param folder: 根目录
+    :param extensions: 只收集这些扩展名的文件，为 None 时收集所有文件
+    :param workers: 获取文件状态（stat）的线程数
+    :return: (树形结构行列表, [(文件路径, 文件名, os.stat_result), ...])，均按名称排序
+    """
+    tree_lines = []
+    files = []
+
+    # 递归遍历目录并生成树形结构
+    def walk(directory, prefix=""):
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)  # 按名称排序
+        io_counter.dir_scans += 1
+        for i, entry in enumerate(entries):
+            is_last = (i == len(entries) - 1)  # 是否是最后一个条目
+
+            # 写入当前条目
+            tree_lines.append(f"{prefix}{'└── ' if is_last else '├── '}{entry.name}\n")
+
+            # 如果是文件夹，递归处理
+            if entry.is_dir():
+                walk(entry.path, prefix + ("    " if is_last else "│   "))
+            elif extensions is None or entry.name.endswith(extensions):
+                files.append(entry)
+
+    walk(folder)
+    stats = map_io(lambda entry: entry.stat(), files, workers)
+    return tree_lines, [(entry.path, entry.name, stat) for entry, stat in zip(files, stats)]
+
+def load_source_file(file_path, file_name, data=None):
+    """
+    读取一次源文件，在同一份内容上完成忽略标识检查与注释检查
+    :param data: 已读取的文件内容，为 None 时读取文件
+    :return: (原始字节, 文本内容)；需要跳过时返回 None
+    """
+    if data is None:
+        data = read_file_bytes(file_path)
+    text = decode_source(data)
+    # 先检查文件第一行是否包含忽略标识
+    if text.split('\n', 1)[0].strip() == IGNORE_EXPORT_MARKER:
+        print(f"文件 {file_name} 包含 {IGNORE_EXPORT_MARKER}，跳过处理。")
+        return None
+    # 再检查文件是否全部被注释
+    if is_fully_commented_text(text, os.path.splitext(file_name)[1]):
+        print(f"文件 {file_name} 被完全注释，跳过处理。")
+        return None
+    return data, text
+
+def content_hash(data):
+    """文件内容哈希（用于增量模式判断内容是否真的变化）"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def merged_segment(file_name, text):
+    """合并文件中单个源文件的片段（字节），换行符与文本模式写入一致"""
+    return f"\n\n// === File: {file_name} ===\n\n{text}".replace("\n", os.linesep).encode('utf-8')
+
+def merged_text(file_name, text, strip):
+    """写入合并文件的内容：需要时去除注释"""
+    return strip_comments(text, os.path.splitext(file_name)[1]) if strip else text
+
+def load_manifest(dest_folder):
+    """读取增量清单，不存在或版本不符时返回 None"""
+    manifest_file = os.path.join(dest_folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+def save_manifest(dest_folder, manifest):
+    manifest["version"] = MANIFEST_VERSION
+    with open(os.path.join(dest_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+def write_all_code(all_code_file, layout, old_size):
+    """
+    按片段偏移索引更新合并文件，只改写变化的部分
+    :param layout: [(新片段字节或 None, 旧偏移, 旧长度), ...]，按文件顺序；None 表示沿用旧文件中的片段
+    :param old_size: 旧合并文件的大小，为 None 时整体重写
+    :return: 实际写入的字节数
+    """
+    if old_size is None:
+        data = b"".join(segment for segment, _, _ in layout)
+        write_file_bytes(all_code_file, data)
+        return len(data)
+
+    # 找到第一个位置发生变化的片段：在它之前的内容原样保留
+    new_offset = 0
+    first_shift = len(layout)
+    for i, (segment, old_offset, old_length) in enumerate(layout):
+        length = old_length if segment is None else len(segment)
+        if old_offset != new_offset or length != old_length:
+            first_shift = i
+            break
+        new_offset += length
+    new_size = sum(old_length if segment is None else len(segment) for segment, _, old_length in layout)
+
+    written = 0
+    with open(all_code_file, 'r+b') as f:
+        # 位置未变化的片段：只在原位置改写内容变化的片段
+        for segment, old_offset, _ in layout[:first_shift]:
+            if segment is not None:
+                f.seek(old_offset)
+                f.write(segment)
+                written += len(segment)
+
+        # 从第一个位置变化的片段开始，后续内容整体后移/前移：只读取一次旧文件尾部
+        if first_shift < len(layout) or new_size != old_size:
+            reused = [(old_offset, old_length) for segment, old_offset, old_length in layout[first_shift:] if segment is None]
+            tail_start = min(old_offset for old_offset, _ in reused) if reused else old_size
+            f.seek(tail_start)
+            tail = f.read()
+            io_counter.add(reads=1, bytes_read=len(tail))
+
+            f.seek(new_offset)
+            for segment, old_offset, old_length in layout[first_shift:]:
+                if segment is None:
+                    segment = tail[old_offset - tail_start:old_offset - tail_start + old_length]
+                f.write(segment)
+                written += len(segment)
+            f.truncate(new_size)
+
+    if written:
+        io_counter.add(writes=1, bytes_written=written)
+    return written
+
+def flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative, merge_files=False, copy_files=True, incremental=False, strip_merged_comments=False, workers=1):
     # 构建完整路径
     src_folder = os.path.join(root_folder, src_relative)
     dest_folder = os.path.join(root_folder, dest_relative)
     structure_file = os.path.join(root_folder, structure_relative)
-
-    # 删除目标文件夹（如果存在）
-    if os.path.exists(dest_folder):
-        shutil.rmtree(dest_folder)
-
-    # 创建目标文件夹
-    os.makedirs(dest_folder)
-
-    # 打开文件以保存目录结构
-    with open(structure_file, 'w', encoding='utf-8') as f:
-        # 递归遍历目录并生成树形结构
-        def write_tree(directory, prefix=""):
-            # 获取目录下的所有文件和文件夹
-            entries = os.listdir(directory)
-            entries.sort()  # 按名称排序
-            for i, entry in enumerate(entries):
-                full_path = os.path.join(directory, entry)
-                is_last = (i == len(entries) - 1)  # 是否是最后一个条目
-
-                # 写入当前条目
-                f.write(f"{prefix}{'└── ' if is_last else '├── '}{entry}\n")
-
-                # 如果是文件夹，递归处理
-                if os.path.isdir(full_path):
-                    write_tree(full_path, prefix + ("    " if is_last else "│   "))
-
-        # 写入树形结构
-        f.write(f"{src_folder}\n")  # 使用完整路径
-        write_tree(src_folder)
+    all_code_file = os.path.join(dest_folder, ALL_CODE_NAME)
+
+    # 增量模式：清单存在且选项一致时复用上次结果，否则完全重建
+    options = {"merge": merge_files, "copy": copy_files, "strip": strip_merged_comments}
+    manifest = load_manifest(dest_folder) if incremental else None
+    if manifest is None or manifest["options"] != options:
+        if incremental:
+            print("增量清单不存在或选项已变化，执行完全重建。")
+        # 删除目标文件夹（如果存在）
+        if os.path.exists(dest_folder):
+            shutil.rmtree(dest_folder)
+        # 创建目标文件夹
+        os.makedirs(dest_folder)
+        manifest = {"options": options, "files": {}}
+    old_entries = manifest["files"]
+
+    # 上次的合并文件完好（大小与清单一致）时，未变化的文件沿用其中的片段，不读取源文件
+    old_all_code_size = None
+    if merge_files and old_entries and os.path.exists(all_code_file) \
+            and os.path.getsize(all_code_file) == manifest.get("all_code_size"):
+        old_all_code_size = manifest["all_code_size"]
+
+    # 只遍历一次 src：同时得到树形结构和需要处理的文件
+    tree_lines, source_files = scan_tree(src_folder, SOURCE_EXTENSIONS, workers)
+
+    # 保存目录结构（内容变化时才重写）
+    tree_text = f"{src_folder}\n" + "".join(tree_lines)  # 使用完整路径
+    tree_hash = content_hash(tree_text.encode('utf-8'))
+    if tree_hash != manifest.get("tree_hash") or not os.path.exists(structure_file):
+        with open(structure_file, 'w', encoding='utf-8') as f:
+            f.write(tree_text)
+
+    # 扁平化复制时同名文件会写到同一个目标文件：按遍历顺序由第一个文件占用该文件名，其余只参与合并，不复制
+    name_owners = {}
+    for file_path, file_name, _ in source_files:
+        name_owners.setdefault(file_name, file_path)
+    if copy_files:
+        for file_path, file_name, _ in source_files:
+            if name_owners[file_name] != file_path:
+                print(f"文件 {os.path.relpath(file_path, src_folder)} 与 "
+                      f"{os.path.relpath(name_owners[file_name], src_folder)} 同名，扁平化复制时跳过。")
+
+    def process_file(source_file):
+        """处理单个源文件（可在线程池中执行），返回 (相对路径, 清单条目, 合并片段, 是否复制)；片段为 None 表示沿用旧片段"""
+        file_path, file_name, file_stat = source_file
+        rel_path = os.path.relpath(file_path, src_folder).replace(os.sep, '/')
+        old = old_entries.get(rel_path)
+        owns_name = name_owners[file_name] == file_path
+        data = None
+        segment = None
+        copied = False
+
+        if old and old["size"] == file_stat.st_size and old["mtime"] == file_stat.st_mtime_ns:
+            # 大小和修改时间都没变：不读取文件
+            entry = dict(old)
+        else:
+            # 每个文件只读取一次，后续检查、合并、复制、统计都使用这份内容
+            data = read_file_bytes(file_path)
+            digest = content_hash(data)
+            if old and old["hash"] == digest:
+                # 只是修改时间变了，内容未变
+                entry = dict(old, mtime=file_stat.st_mtime_ns)
+            else:
+                entry = {"size": file_stat.st_size, "mtime": file_stat.st_mtime_ns, "hash": digest,
+                         "name": file_name, "exported": False, "lines": 0}
+                loaded = load_source_file(file_path, file_name, data)
+                if loaded is not None:
+                    text = loaded[1]
+                    entry["exported"] = True
+                    entry["lines"] = len(text.splitlines())
+                    if merge_files:
+                        segment = merged_segment(file_name, merged_text(file_name, text, strip_merged_comments))
+                    # 复制文件到目标文件夹（直接覆盖文件，并保留时间戳等元数据）
+                    if copy_files and owns_name:
+                        dest_file_path = os.path.join(dest_folder, file_name)
+                        write_file_bytes(dest_file_path, data)
+                        shutil.copystat(file_path, dest_file_path)
+                        copied = True
+
+        # 同名文件中占用文件名的文件变了（原占用者被删除或不再导出）：内容未变也需要复制
+        should_copy = copy_files and entry["exported"] and owns_name
+        if should_copy and not copied and not entry.get("copied", entry["exported"]):
+            if data is None:
+                data = read_file_bytes(file_path)
+            dest_file_path = os.path.join(dest_folder, file_name)
+            write_file_bytes(dest_file_path, data)
+            shutil.copystat(file_path, dest_file_path)
+            copied = True
+        entry["copied"] = should_copy
+
+        if entry["exported"] and merge_files and segment is None \
+                and (old_all_code_size is None or "offset" not in entry):
+            # 没有可沿用的旧片段：用已读取的内容生成（大小和修改时间都没变时才需要读取源文件）
+            if data is None:
+                data = read_file_bytes(file_path)
+            text = decode_source(data)
+            segment = merged_segment(file_name, merged_text(file_name, text, strip_merged_comments))
+        return rel_path, entry, segment, copied
 
     # 统计信息
     file_count = 0
     total_lines = 0
+    copied_count = 0
+    reused_count = 0
+
+    # 按源文件顺序汇总结果，合并文件的顺序与完成顺序无关
+    entries = {}
+    layout = []
+    offset = 0
+    for rel_path, entry, segment, copied in map_io(process_file, source_files, workers):
+        copied_count += copied
+        if entry["exported"]:
+            if merge_files:
+                # 片段偏移索引：记录每个文件在合并文件中的位置，供增量/监视模式只改写变化的片段
+                length = entry["length"] if segment is None else len(segment)
+                layout.append((segment, entry.get("offset", -1), entry.get("length", -1)))
+                reused_count += segment is None
+                entry["offset"] = offset
+                entry["length"] = length
+                offset += length
+            # 统计行数
+            total_lines += entry["lines"]
+            file_count += 1
+        entries[rel_path] = entry
+
+    # 删除源文件已删除或已不再导出的复制文件
+    removed_count = 0
+    if copy_files:
+        kept_names = {e["name"] for e in entries.values() if e["copied"]}
+        for rel_path, old in old_entries.items():
+            if old.get("copied", old["exported"]) and old["name"] not in kept_names:
+                dest_file_path = os.path.join(dest_folder, old["name"])
+                if os.path.exists(dest_file_path):
+                    os.remove(dest_file_path)
+                    removed_count += 1
 
     # 如果需要合并文件内容
+    written = 0
     if merge_files:
-        all_code_file = os.path.join(dest_folder, "__src_allCode.txt")
-        with open(all_code_file, 'w', encoding='utf-8') as all_code:
-            # 遍历 src 文件夹
-            for root, dirs, files in os.walk(src_folder):
-                for file in files:
-                    if file.endswith(('.ts', '.tsx', '.css', '.html', '.js')):
-                        file_path = os.path.join(root, file)
-                        # 先检查文件第一行是否包含忽略标识
-                        with open(file_path, 'r', encoding='utf-8') as src_file:
-                            first_line = src_file.readline()
-                            if first_line.strip() == IGNORE_EXPORT_MARKER:
-                                print(f"文件 {file} 包含 {IGNORE_EXPORT_MARKER}，跳过处理。")
-                                continue
-                        # 再检查文件是否全部被注释
-                        if is_fully_commented(file_path):
-                            print(f"文件 {file} 被完全注释，跳过处理。")
-                            continue
-                        # 写入文件名作为分隔符
-                        all_code.write(f"\n\n// === File: {file} ===\n\n")
-                        # 写入文件内容
-                        with open(file_path, 'r', encoding='utf-8') as src_file:
-                            content = src_file.read()
-                            all_code.write(content)
-                            # 统计行数
-                            lines = content.splitlines()
-                            total_lines += len(lines)
-                            file_count += 1
-
-    # 复制文件到目标文件夹
-    for root, dirs, files in os.walk(src_folder):
-        for file in files:
-            if file.endswith(('.ts', '.tsx', '.css', '.html', '.js')):
-                src_file_path = os.path.join(root, file)
-                # 先检查文件第一行是否包含忽略标识
-                with open(src_file_path, 'r', encoding='utf-8') as src_file:
-                    first_line = src_file.readline()
-                    if first_line.strip() == IGNORE_EXPORT_MARKER:
-                        print(f"文件 {file} 包含 {IGNORE_EXPORT_MARKER}，跳过处理。")
-                        continue
-                # 再检查文件是否全部被注释
-                if is_fully_commented(src_file_path):
-                    print(f"文件 {file} 被完全注释，跳过处理。")
-                    continue
-                dest_file_path = os.path.join(dest_folder, file)
-                # 直接覆盖文件
-                shutil.copy2(src_file_path, dest_file_path)
-                # 统计行数
-                with open(src_file_path, 'r', encoding='utf-8') as src_file:
-                    lines = src_file.readlines()
-                    total_lines += len(lines)
-                    file_count += 1
+        written = write_all_code(all_code_file, layout, old_all_code_size)
+
+    save_manifest(dest_folder, {"options": options, "files": entries, "all_code_size": offset, "tree_hash": tree_hash})
 
-    print(f"所有文件已复制到: {dest_folder}")
+    if old_entries:
+        print(f"增量更新：复制 {copied_count} 个文件，删除 {removed_count} 个文件，复用 {reused_count} 个合并片段"
+              f"{f'，合并文件改写 {written} 字节' if merge_files else ''}。")
+    if copy_files:
+        print(f"所有文件已复制到: {dest_folder}")
     print(f"目录结构已保存到: {structure_file}")
     if merge_files:
-        print(f"所有文件内容已合并到: {os.path.join(dest_folder, '__src_allCode.txt')}")
+        print(f"所有文件内容已合并到: {all_code_file}")
 
     # 返回统计信息
     return file_count, total_lines
 
-def merge_game_files(root_folder, game_relative, dest_relative):
+def merge_game_files(root_folder, game_relative, dest_relative, workers=1):
     # 构建完整路径
     game_folder = os.path.join(root_folder, game_relative)
     dest_folder = os.path.join(root_folder, dest_relative)
@@ -162,21 +534,27 @@ def merge_game_files(root_folder, game_relative, dest_relative):
         os.makedirs(dest_folder)
 
     # 需要合并的文件列表
-    files_to_merge = ["index.html", "package.json", "tsconfig.json", "vite.config.ts"]
+    files_to_merge = ENV_FILES
 
     file_line_counts = {}
 
+    def load(file_name):
+        """判空并读取（可在线程池中执行），为空或不存在时返回 None"""
+        file_path = os.path.join(game_folder, file_name)
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            return decode_source(read_file_bytes(file_path))
+        return None
+
+    contents = map_io(load, files_to_merge, workers)
+
     with open(merged_file, 'w', encoding='utf-8') as merged:
-        for file_name in files_to_merge:
-            file_path = os.path.join(game_folder, file_name)
-            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+        for file_name, content in zip(files_to_merge, contents):
+            if content is not None:
                 merged.write(f"\n\n// === File: {file_name} ===\n\n")
-                with open(file_path, 'r', encoding='utf-8') as src_file:
-                    content = src_file.read()
-                    merged.write(content)
-                    # 统计行数
-                    lines = content.splitlines()
-                    file_line_counts[file_name] = len(lines)
+                merged.write(content)
+                # 统计行数
+                lines = content.splitlines()
+                file_line_counts[file_name] = len(lines)
             else:
                 print(f"文件 {file_name} 为空或不存在，跳过合并。")
 
@@ -185,55 +563,273 @@ def merge_game_files(root_folder, game_relative, dest_relative):
     # 返回统计信息
     return file_line_counts
 
-def save_public_structure(root_folder, public_relative, structure_relative):
+def hash_file(file_path):
+    """分块读取并计算文件内容哈希（大文件不会一次性读入内存；hashlib 计算时释放 GIL，可在线程池中并行）"""
+    digest = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    total = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+            total += size
+    io_counter.add(reads=1, bytes_read=total)
+    return digest.hexdigest()
+
+def load_asset_index(index_file):
+    """读取上次的资源索引，返回 {相对路径: 条目}；不存在或版本不符时返回空字典"""
+    if not os.path.exists(index_file):
+        return {}
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index.get("files", {}) if index.get("version") == ASSET_INDEX_VERSION else {}
+
+def build_asset_index(public_folder, public_files, index_file, workers=1):
+    """
+    生成 public 资源索引：按 (路径, 大小, 修改时间) 缓存哈希，只对变化的文件重新计算
+    :param public_files: scan_tree 返回的文件列表
+    :return: 索引字典（files / duplicates / largest），同时写入 index_file
+    """
+    old_files = load_asset_index(index_file)
+
+    def index_file_entry(public_file):
+        file_path, _, file_stat = public_file
+        rel_path = os.path.relpath(file_path, public_folder).replace(os.sep, '/')
+        old = old_files.get(rel_path)
+        if old and old["size"] == file_stat.st_size and old["mtime"] == file_stat.st_mtime_ns:
+            return rel_path, old, False
+        entry = {"size": file_stat.st_size, "mtime": file_stat.st_mtime_ns, "hash": hash_file(file_path)}
+        return rel_path, entry, True
+
+    files = {}
+    hashed_count = 0
+    hashed_size = 0
+    for rel_path, entry, hashed in map_io(index_file_entry, public_files, workers):
+        files[rel_path] = entry
+        if hashed:
+            hashed_count += 1
+            hashed_size += entry["size"]
+
+    # 内容相同（哈希与大小都相同）的文件分为一组
+    groups = {}
+    for rel_path, entry in files.items():
+        groups.setdefault((entry["hash"], entry["size"]), []).append(rel_path)
+    duplicates = [{"hash": digest, "size": size, "files": paths, "wasted": size * (len(paths) - 1)}
+                  for (digest, size), paths in groups.items() if len(paths) > 1]
+    duplicates.sort(key=lambda group: group["wasted"], reverse=True)
+
+    largest = sorted(files.items(), key=lambda item: item[1]["size"], reverse=True)[:LARGEST_ASSET_COUNT]
+    index = {
+        "version": ASSET_INDEX_VERSION,
+        "files": files,
+        "duplicates": duplicates,
+        "largest": [{"path": rel_path, "size": entry["size"]} for rel_path, entry in largest],
+    }
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+
+    print(f"public资源索引已保存到: {index_file}（重新计算哈希 {hashed_count} 个文件，{hashed_size} 字节，"
+          f"复用 {len(files) - hashed_count} 个）")
+    return index
+
+def print_asset_index(index):
+    """打印重复文件组和最大的文件"""
+    duplicates = index["duplicates"]
+    print(f"  重复文件: {len(duplicates)} 组，可节省 {sum(group['wasted'] for group in duplicates)} 字节")
+    for group in duplicates:
+        print(f"    {group['size']} 字节 x {len(group['files'])}: {', '.join(group['files'])}")
+    print(f"  最大的 {len(index['largest'])} 个文件:")
+    for item in index["largest"]:
+        print(f"    {item['size']} 字节: {item['path']}")
+
+def save_public_structure(root_folder, public_relative, structure_relative, workers=1, asset_index_relative=None):
     # 构建完整路径
     public_folder = os.path.join(root_folder, public_relative)
     structure_file = os.path.join(root_folder, structure_relative)
 
-    # 打开文件以保存目录结构
+    # 只遍历一次 public：同时得到树形结构和所有文件的大小
+    tree_lines, public_files = scan_tree(public_folder, workers=workers)
+
+    # 保存目录结构
     with open(structure_file, 'w', encoding='utf-8') as f:
-        # 递归遍历目录并生成树形结构
-        def write_tree(directory, prefix=""):
-            # 获取目录下的所有文件和文件夹
-            entries = os.listdir(directory)
-            entries.sort()  # 按名称排序
-            for i, entry in enumerate(entries):
-                full_path = os.path.join(directory, entry)
-                is_last = (i == len(entries) - 1)  # 是否是最后一个条目
-
-                # 写入当前条目
-                f.write(f"{prefix}{'└── ' if is_last else '├── '}{entry}\n")
-
-                # 如果是文件夹，递归处理
-                if os.path.isdir(full_path):
-                    write_tree(full_path, prefix + ("    " if is_last else "│   "))
-
-        # 写入树形结构
         f.write(f"{public_folder}\n")  # 使用完整路径
-        write_tree(public_folder)
+        f.writelines(tree_lines)
 
     # 统计信息
     total_files = 0
     total_size = 0
     file_type_stats = {}
 
-    for root, dirs, files in os.walk(public_folder):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_size = os.path.getsize(file_path)
-            total_files += 1
-            total_size += file_size
-            ext = os.path.splitext(file)[1].lower()
-            if ext in file_type_stats:
-                file_type_stats[ext]['count'] += 1
-                file_type_stats[ext]['size'] += file_size
-            else:
-                file_type_stats[ext] = {'count': 1, 'size': file_size}
+    for file_path, file_name, file_stat in public_files:
+        file_size = file_stat.st_size
+        total_files += 1
+        total_size += file_size
+        ext = os.path.splitext(file_name)[1].lower()
+        if ext in file_type_stats:
+            file_type_stats[ext]['count'] += 1
+            file_type_stats[ext]['size'] += file_size
+        else:
+            file_type_stats[ext] = {'count': 1, 'size': file_size}
 
     print(f"public目录结构已保存到: {structure_file}")
 
+    # 资源索引模式：计算内容哈希，检测重复文件
+    asset_index = None
+    if asset_index_relative is not None:
+        asset_index = build_asset_index(public_folder, public_files, os.path.join(root_folder, asset_index_relative), workers)
+
     # 返回统计信息
-    return total_files, total_size, file_type_stats
+    return total_files, total_size, file_type_stats, asset_index
+
+def run_stages(root_folder, src_relative, dest_relative, structure_relative, game_relative, public_relative,
+               public_structure_relative, flatten_options, incremental=False, workers=1, asset_index_relative=None):
+    """依次执行各子功能并记录耗时，返回 (功能①②③结果, 功能④结果, 功能⑤结果, 各阶段耗时)"""
+    timings = {}
+
+    start = time.perf_counter()
+    flatten_result = flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative,
+                                                incremental=incremental, workers=workers, **flatten_options)
+    timings["功能①②③"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    file_line_counts = merge_game_files(root_folder, game_relative, dest_relative, workers)
+    timings["功能④"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    public_result = save_public_structure(root_folder, public_relative, public_structure_relative, workers,
+                                          asset_index_relative)
+    timings["功能⑤"] = time.perf_counter() - start
+
+    return flatten_result, file_line_counts, public_result, timings
+
+def print_timings(timings):
+    for stage, seconds in timings.items():
+        print(f"  {stage}: {seconds * 1000:.1f} ms")
+    print(f"  合计: {sum(timings.values()) * 1000:.1f} ms")
+
+def compare_io_modes(root_folder, src_relative, game_relative, public_relative, flatten_options, workers):
+    """分别以顺序模式和并发模式完全重建到临时目录，打印耗时对比"""
+    results = {}
+    for mode_workers in (1, workers):
+        temp_folder = tempfile.mkdtemp(prefix="__flattened_")
+        try:
+            dest_folder = os.path.join(temp_folder, "out")
+            _, _, _, timings = run_stages(
+                root_folder, src_relative, dest_folder, os.path.join(dest_folder, "__src_directory.txt"),
+                game_relative, public_relative, os.path.join(dest_folder, "__public_directory.txt"),
+                flatten_options, False, mode_workers)
+            results[mode_workers] = timings
+        finally:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
+    print(f"\n=== 顺序模式 vs {workers} 线程（完全重建）===")
+    for stage in results[1]:
+        sequential, concurrent = results[1][stage], results[workers][stage]
+        print(f"  {stage}: {sequential * 1000:.1f} ms => {concurrent * 1000:.1f} ms"
+              f"（{sequential / concurrent if concurrent else 0:.2f}x）")
+    sequential, concurrent = sum(results[1].values()), sum(results[workers].values())
+    print(f"  合计: {sequential * 1000:.1f} ms => {concurrent * 1000:.1f} ms（{sequential / concurrent if concurrent else 0:.2f}x）")
+
+def snapshot_stats(folder):
+    """记录目录下所有文件的 (大小, 修改时间)，以及目录树（用于发现新建/删除的空目录）"""
+    if not os.path.isdir(folder):
+        return None
+    tree_lines, files = scan_tree(folder)
+    return tuple(tree_lines), {path: (stat.st_size, stat.st_mtime_ns) for path, _, stat in files}
+
+def snapshot_env(game_folder):
+    """记录功能④各文件的 (大小, 修改时间)"""
+    stats = {}
+    for file_name in ENV_FILES:
+        file_path = os.path.join(game_folder, file_name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            stats[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+def count_changed_files(old, new):
+    """比较两次快照，返回变化（新增、删除、修改）的文件数"""
+    old_files = old[1] if isinstance(old, tuple) else (old or {})
+    new_files = new[1] if isinstance(new, tuple) else (new or {})
+    return sum(1 for path in old_files.keys() | new_files.keys() if old_files.get(path) != new_files.get(path))
+
+def watch_flattened(root_folder, src_relative, dest_relative, structure_relative, game_relative, public_relative,
+                    public_structure_relative, flatten_options, workers=1,
+                    interval=DEFAULT_WATCH_INTERVAL, debounce=DEFAULT_WATCH_DEBOUNCE, asset_index_relative=None):
+    """
+    监视模式：轮询 game/src、game/public 和功能④的文件，变化后等待防抖时间内不再变化，
+    再只执行受影响的子功能（功能①②③以增量模式执行，只改写变化的复制文件和合并文件片段）。Ctrl+C 退出
+    """
+    snapshots = {
+        "功能①②③": lambda: snapshot_stats(os.path.join(root_folder, src_relative)),
+        "功能④": lambda: snapshot_env(os.path.join(root_folder, game_relative)),
+        "功能⑤": lambda: snapshot_stats(os.path.join(root_folder, public_relative)),
+    }
+    stages = {
+        "功能①②③": lambda: flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative,
+                                                    incremental=True, workers=workers, **flatten_options),
+        "功能④": lambda: merge_game_files(root_folder, game_relative, dest_relative, workers),
+        "功能⑤": lambda: save_public_structure(root_folder, public_relative, public_structure_relative, workers,
+                                              asset_index_relative),
+    }
+
+    def take_snapshots():
+        # 编辑器原子保存时文件可能在列出与读取属性之间被删除，本次返回 None，下次轮询重试
+        try:
+            return {stage: take() for stage, take in snapshots.items()}
+        except OSError as e:
+            print(f"  读取文件状态失败（稍后重试）：{e}")
+            return None
+
+    state = {stage: take() for stage, take in snapshots.items()}
+
+    print(f"\n监视中（每 {interval} 秒检查一次，防抖 {debounce} 秒），按 Ctrl+C 退出……")
+    try:
+        while True:
+            time.sleep(interval)
+            current = take_snapshots()
+            if current is None or current == state:
+                continue
+
+            # 防抖：等待一段时间内不再有变化，把连续保存合并为一次更新
+            while True:
+                time.sleep(debounce)
+                settled = take_snapshots()
+                if settled == current:
+                    break
+                if settled is not None:
+                    current = settled
+
+            changed = {stage: count_changed_files(state[stage], current[stage])
+                       for stage in stages if current[stage] != state[stage]}
+            print(f"\n[{time.strftime('%H:%M:%S')}] 检测到变化：" +
+                  "，".join(f"{stage} {count} 个文件" for stage, count in changed.items()))
+            io_counter.reset()
+            timings = {}
+            failed = set()
+            for stage in changed:
+                start = time.perf_counter()
+                # 某个子功能出错（文件正在写入、刚被删除等）时只打印错误，不退出监视；
+                # 该子功能的快照保持不变，下次轮询时重新执行
+                try:
+                    stages[stage]()
+                except Exception as e:
+                    print(f"  {stage} 执行失败（下次检查时重试）：{type(e).__name__}: {e}")
+                    failed.add(stage)
+                    continue
+                timings[stage] = time.perf_counter() - start
+            print(f"  {io_counter.summary()}")
+            if timings:
+                print_timings(timings)
+            state = {stage: state[stage] if stage in failed else current[stage] for stage in current}
+    except KeyboardInterrupt:
+        print("\n已退出监视模式。")
 
 def show_options():
     # 创建Tkinter根窗口
@@ -251,10 +847,35 @@ def show_options():
           "现在，你可以输入这些选项来执行特定子功能的组合\n"
           "1. 默认功能：所有子功能\n"
           "2. 选项1：① + ④ + ⑤ + ② \n"
-          "3. 选项2：① + ④ + ⑤ + ③ \n")
+          "3. 选项2：① + ④ + ⑤ + ③ \n"
+          "4. 选项3：执行默认功能后进入监视模式，源文件变化时只更新受影响的部分 \n")
 
     # 获取用户输入
-    user_input = input("请输入选项：(默认空白), 1, 2: ").strip()
+    user_input = input("请输入选项：(默认空白), 1, 2, 3: ").strip()
+    watch_mode = user_input == "3"
+    if watch_mode:
+        user_input = ""
+
+    # 增量模式：只复制变化的文件；命令行带 --full 时强制完全重建
+    if "--full" in sys.argv[1:]:
+        incremental = False
+    else:
+        incremental = input("是否增量更新（y: 只处理变化的文件, n: 完全重建，默认 y）：").strip().lower() != 'n'
+
+    # 合并文件是否去除注释（体积更小，便于传输和处理）
+    strip_merged_comments = user_input != "1" and input("合并文件是否去除注释（y/n，默认 n）：").strip().lower() == 'y'
+
+    # 并发模式：读取、stat、复制在有界线程池中执行
+    workers = input(f"请输入 I/O 线程数（1 为顺序执行，默认 {DEFAULT_IO_WORKERS}）：").strip()
+    workers = int(workers) if workers else DEFAULT_IO_WORKERS
+    if watch_mode:
+        interval = input(f"请输入监视轮询间隔（秒，默认 {DEFAULT_WATCH_INTERVAL}）：").strip()
+        interval = float(interval) if interval else DEFAULT_WATCH_INTERVAL
+        debounce = input(f"请输入防抖时间（秒，默认 {DEFAULT_WATCH_DEBOUNCE}）：").strip()
+        debounce = float(debounce) if debounce else DEFAULT_WATCH_DEBOUNCE
+    # 资源索引模式：计算 public 文件的内容哈希（按大小和修改时间缓存），检测重复文件
+    asset_index = input("是否生成 public 资源索引并检测重复文件（y/n，默认 n）：").strip().lower() == 'y'
+    compare_modes = not watch_mode and workers > 1 and input("是否与顺序模式对比耗时（y/n，默认 n）：").strip().lower() == 'y'
 
     # 设置根文件夹为当前脚本所在目录
     root_folder = os.path.dirname(os.path.abspath(__file__)) #取__file__所在目录作为根目录
@@ -267,78 +888,26 @@ def show_options():
     game_relative = "game"  # game 文件夹相对于根文件夹的路径
     public_relative = "game/public"  # public 文件夹相对于根文件夹的路径
     public_structure_relative = "__flattened/__public_directory.txt"  # public目录结构文件相对于根文件夹的路径
+    asset_index_relative = f"__flattened/{ASSET_INDEX_NAME}" if asset_index else None  # public资源索引文件相对于根文件夹的路径
 
     # 根据用户输入执行相应功能
     if user_input == "":
         # 默认功能：合并文件
-        file_count, total_lines = flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative, merge_files=True)
-        file_line_counts = merge_game_files(root_folder, game_relative, dest_relative)
-        total_files, total_size, file_type_stats = save_public_structure(root_folder, public_relative, public_structure_relative)
+        flatten_options = {"merge_files": True, "strip_merged_comments": strip_merged_comments}
     elif user_input == "1":
         # 选项1：不合并文件
-        file_count, total_lines = flatten_and_save_structure(root_folder, src_relative, dest_relative, structure_relative, merge_files=False)
-        file_line_counts = merge_game_files(root_folder, game_relative, dest_relative)
-        total_files, total_size, file_type_stats = save_public_structure(root_folder, public_relative, public_structure_relative)
+        flatten_options = {"merge_files": False}
     elif user_input == "2":
         # 选项2：仅输出目录结构和合并后的代码
-        # 删除目标文件夹（如果存在）
-        if os.path.exists(dest_relative):
-            shutil.rmtree(dest_relative)
-        # 创建目标文件夹
-        os.makedirs(dest_relative)
-        # 仅生成目录结构和合并文件
-        with open(structure_relative, 'w', encoding='utf-8') as f:
-            def write_tree(directory, prefix=""):
-                entries = os.listdir(directory)
-                entries.sort()
-                for i, entry in enumerate(entries):
-                    full_path = os.path.join(directory, entry)
-                    is_last = (i == len(entries) - 1)
-                    f.write(f"{prefix}{'└── ' if is_last else '├── '}{entry}\n")
-                    if os.path.isdir(full_path):
-                        write_tree(full_path, prefix + ("    " if is_last else "│   "))
-
-            f.write(f"{src_relative}\n")
-            write_tree(src_relative)
-
-        all_code_file = os.path.join(dest_relative, "__src_allCode.txt")
-        file_count = 0  # 初始化文件数量
-        total_lines = 0  # 初始化总代码行数
-        with open(all_code_file, 'w', encoding='utf-8') as all_code:
-            for root, dirs, files in os.walk(src_relative):
-                for file in files:
-                    if file.endswith(('.ts', '.tsx', '.css', '.html', '.js')):
-                        file_path = os.path.join(root, file)
-                        # 先检查文件第一行是否包含忽略标识
-                        with open(file_path, 'r', encoding='utf-8') as src_file:
-                            first_line = src_file.readline()
-                            if first_line.strip() == IGNORE_EXPORT_MARKER:
-                                print(f"文件 {file} 包含 {IGNORE_EXPORT_MARKER}，跳过处理。")
-                                continue
-                        # 再检查文件是否全部被注释
-                        if is_fully_commented(file_path):
-                            print(f"文件 {file} 被完全注释，跳过处理。")
-                            continue
-                        # 写入文件名作为分隔符
-                        all_code.write(f"\n\n// === File: {file} ===\n\n")
-                        # 写入文件内容
-                        with open(file_path, 'r', encoding='utf-8') as src_file:
-                            content = src_file.read()
-                            all_code.write(content)
-                            # 统计行数
-                            lines = content.splitlines()
-                            total_lines += len(lines)
-                            file_count += 1
-
-        file_line_counts = merge_game_files(root_folder, game_relative, dest_relative)
-        total_files, total_size, file_type_stats = save_public_structure(root_folder, public_relative, public_structure_relative)
-
-        print(f"目录结构已保存到: {structure_relative}")
-        print(f"所有文件内容已合并到: {all_code_file}")
+        flatten_options = {"merge_files": True, "copy_files": False, "strip_merged_comments": strip_merged_comments}
     else:
         print("无效的选项，程序退出。")
         return
 
+    (file_count, total_lines), file_line_counts, (total_files, total_size, file_type_stats, public_assets), timings = run_stages(
+        root_folder, src_relative, dest_relative, structure_relative, game_relative, public_relative,
+        public_structure_relative, flatten_options, incremental, workers, asset_index_relative)
+
     # 输出统计信息
     print("\n=== 统计信息 ===")
     print(f"功能①②③：")
@@ -355,6 +924,22 @@ def show_options():
     print(f"  总空间大小: {total_size} 字节")
     for ext, stats in file_type_stats.items():
         print(f"  {ext} 文件: {stats['count']} 个, {stats['size']} 字节, 占比 {stats['size'] / total_size * 100:.2f}%")
+    if public_assets is not None:
+        print_asset_index(public_assets)
+
+    print("\nI/O 统计：")
+    print(f"  {io_counter.summary()}")
+
+    print(f"\n耗时（{workers} 线程）：")
+    print_timings(timings)
+
+    # 在临时目录中分别以顺序模式和并发模式完全重建，对比耗时（不影响 __flattened）
+    if compare_modes:
+        compare_io_modes(root_folder, src_relative, game_relative, public_relative, flatten_options, workers)
+
+    if watch_mode:
+        watch_flattened(root_folder, src_relative, dest_relative, structure_relative, game_relative, public_relative,
+                        public_structure_relative, flatten_options, workers, interval, debounce, asset_index_relative)
 
     # 提示用户按回车结束
     input("\n已结束，回车可结束。")
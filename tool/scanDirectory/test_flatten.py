@@ -0,0 +1,65 @@
+# 运行：在本目录下执行 python -m pytest -q
+import os
+
+from __flatten import flatten_and_save_structure, is_fully_commented_text, strip_comments
+
+
+def test_division_after_identifier_ending_with_keyword():
+    # margin 以 in 结尾，但其后的 "/" 是除号；若误判为正则，字符串中的 "//" 会被当作注释删除
+    text = 'const half = margin / 2 + "/"; const u = "//cdn.example.com/x.js";\n'
+    assert strip_comments(text, '.ts') == text
+
+
+def test_regex_after_keyword():
+    assert strip_comments('return /"/g; // 注释\n', '.js') == 'return /"/g;\n'
+
+
+
+def test_nested_template_literal():
+    # 嵌套模板字符串结束后，后面字符串里的 "//" 不是注释
+    text = 'const s = `a${f(`b`)}c`; const u = "//cdn.example.com/x.js"; // 注释\n'
+    assert strip_comments(text, '.ts') == 'const s = `a${f(`b`)}c`; const u = "//cdn.example.com/x.js";\n'
+
+
+def test_template_expression_with_braces_and_strings():
+    text = 'const s = `a${ {k: `x${y}`}.k + "}" }b // 不是注释`; // 注释\n'
+    assert strip_comments(text, '.ts') == 'const s = `a${ {k: `x${y}`}.k + "}" }b // 不是注释`;\n'
+
+
+def test_jsx_text_is_left_alone():
+    text = 'const link = <a>http://x</a>; // 注释\n'
+    assert strip_comments(text, '.tsx') == text
+
+
+def test_block_comment_between_tokens():
+    assert strip_comments('a /* 注释 */ b\n/* 多行\n注释 */\nc\n', '.js') == 'a   b\nc\n'
+
+
+def test_fully_commented_detection():
+    assert is_fully_commented_text('// a\n/* b */\n', '.ts')
+    assert not is_fully_commented_text('/* a */ const b = 1;\n', '.ts')
+    assert not is_fully_commented_text('const s = "// a";\n', '.ts')
+    assert is_fully_commented_text('/* a */\n', '.css')
+    assert not is_fully_commented_text('<!-- a --><div></div>', '.html')
+
+
+def _flatten(root, dest, incremental):
+    flatten_and_save_structure(str(root), "game/src", dest, f"{dest}/__src_directory.txt",
+                               merge_files=True, incremental=incremental, workers=4)
+
+
+def test_same_basename_keeps_first_in_walk_order(tmp_path):
+    src = tmp_path / "game" / "src"
+    for folder, text in (("a", "const a = 1;\n"), ("b", "const b = 2;\n")):
+        (src / folder).mkdir(parents=True)
+        (src / folder / "util.ts").write_text(text)
+    _flatten(tmp_path, "inc", True)
+    assert (tmp_path / "inc" / "util.ts").read_text() == "const a = 1;\n"
+
+    # 删除占用文件名的文件后，增量更新与完全重建结果一致
+    os.remove(src / "a" / "util.ts")
+    _flatten(tmp_path, "inc", True)
+    _flatten(tmp_path, "full", False)
+    for name in ("util.ts", "__src_allCode.txt"):
+        assert (tmp_path / "inc" / name).read_bytes() == (tmp_path / "full" / name).read_bytes()
+    assert (tmp_path / "inc" / "util.ts").read_text() == "const b = 2;\n"
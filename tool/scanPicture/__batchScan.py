@@ -0,0 +1,284 @@
+# pip install pillow numpy tqdm opencv-python scikit-image scikit-learn # 本程序所需插件（同 __scanPictureToMap.py）
+# ----------------------------------------
+# 多图批量取样（流水线）：解码 -> 分类 -> 写出 三个阶段重叠执行
+#   解码线程：提前读取并解码后面的图片，放入解码队列
+#   计算线程（可多个）：提取颜色规则、取样、区域分析、填满高度，放入写出队列
+#     颜色规则提取与取样大部分是 Python 循环，受 GIL 限制，默认由每个计算线程把任务交给进程池执行
+#   写出线程：序列化 JSON 并写入磁盘（同时写出邻接表、区域表）
+# 阶段之间使用有界队列，队列满时上游等待，内存占用可控；结束后报告各阶段的忙碌占比，用于判断瓶颈
+# ----------------------------------------
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from __hexTables import save_hex_tables
+from __mapPipeline import scan_image
+from __mapRegions import DEFAULT_LAKE_MAX_SIZE, parse_lake_input, save_regions
+from __scanPictureToMap import process_map_data
+
+DEFAULT_COMPUTE_WORKERS = 2
+DEFAULT_DECODE_DEPTH = 2  # 解码队列深度：最多提前解码的图片数
+DEFAULT_WRITE_DEPTH = 4  # 写出队列深度：最多等待写出的结果数
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+OUTPUT_SUFFIX = "_map_data.json"
+
+_DONE = object()  # 队列结束标记
+
+
+class StageStats:
+    """记录一个阶段的忙碌时间与等待时间（线程安全）"""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+        self.items = 0
+        self.lock = threading.Lock()
+
+    def add(self, busy=0.0, wait_input=0.0, wait_output=0.0, items=0):
+        with self.lock:
+            self.busy += busy
+            self.wait_input += wait_input
+            self.wait_output += wait_output
+            self.items += items
+
+    def utilization(self, wall):
+        """忙碌占比：忙碌时间 / (线程数 * 总耗时)"""
+        return self.busy / (self.workers * wall) if wall > 0 else 0.0
+
+
+def collect_images(pattern):
+    """输入为目录时取其中的所有图片，否则按通配符匹配，按名称排序"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    return sorted(path for path in glob.glob(pattern)
+                  if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS and os.path.isfile(path))
+
+
+def output_path_for(image_path, output_dir):
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(output_dir, f"{base_name}{OUTPUT_SUFFIX}")
+
+
+def decode_image(image_path):
+    """解码阶段：读取并完整解码（load 确保解码在本阶段完成，而不是延迟到计算阶段）"""
+    image = Image.open(image_path).convert("RGB")
+    image.load()
+    return image
+
+
+def compute_map(image, options):
+    """计算阶段：取样并做后续处理，返回 (地图数据, 区域表)"""
+    data, _, _ = scan_image(image, options["size_input"], options["sampling_method"], None, options["sampling_type"])
+    return process_map_data(data, options["sampling_type"], options["lake_max_size"], options["normalize_height"])
+
+
+def write_map(output_path, data, regions):
+    """写出阶段：与 __scanPictureToMap.py 相同的产物（map_data.json、邻接表、区域表）"""
+    with open(output_path, "w") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+    save_hex_tables(output_path, [d["x"] for d in data], [d["y"] for d in data])
+    if regions is not None:
+        save_regions(output_path, regions)
+
+
+def _timed_get(q):
+    start = time.perf_counter()
+    item = q.get()
+    return item, time.perf_counter() - start
+
+
+def _timed_put(q, item):
+    start = time.perf_counter()
+    q.put(item)
+    return time.perf_counter() - start
+
+
+def run_batch(image_paths, output_dir, options, compute_workers=DEFAULT_COMPUTE_WORKERS,
+              decode_depth=DEFAULT_DECODE_DEPTH, write_depth=DEFAULT_WRITE_DEPTH, use_processes=True):
+    """
+    流水线批量取样
+    :param options: size_input / sampling_method / sampling_type / lake_max_size / normalize_height
+    :param use_processes: 计算在进程池中执行（否则在计算线程中直接执行）
+    :return: (结果列表 [(图片路径, 输出路径或 None, 错误信息或 None)], 各阶段统计, 总耗时)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    decoded = queue.Queue(maxsize=max(1, decode_depth))
+    computed = queue.Queue(maxsize=max(1, write_depth))
+    stages = {
+        "解码": StageStats("解码"),
+        "计算": StageStats("计算", compute_workers),
+        "写出": StageStats("写出"),
+    }
+    results = {}
+    results_lock = threading.Lock()
+
+    def record(image_path, output_path, error):
+        with results_lock:
+            results[image_path] = (image_path, output_path, error)
+
+    def decoder():
+        stats = stages["解码"]
+        for image_path in image_paths:
+            start = time.perf_counter()
+            try:
+                item = (image_path, decode_image(image_path), None)
+            except Exception as e:
+                item = (image_path, None, f"解码失败: {e}")
+            busy = time.perf_counter() - start
+            stats.add(busy=busy, wait_output=_timed_put(decoded, item), items=1)
+        for _ in range(compute_workers):
+            decoded.put(_DONE)
+
+    def computer():
+        stats = stages["计算"]
+        while True:
+            item, waited = _timed_get(decoded)
+            stats.add(wait_input=waited)
+            if item is _DONE:
+                computed.put(_DONE)
+                return
+            image_path, image, error = item
+            if error is None:
+                start = time.perf_counter()
+                try:
+                    if executor is not None:
+                        data, regions = executor.submit(compute_map, image, options).result()
+                    else:
+                        data, regions = compute_map(image, options)
+                    item = (image_path, data, regions, None)
+                except Exception as e:
+                    item = (image_path, None, None, f"取样失败: {e}")
+                stats.add(busy=time.perf_counter() - start, items=1)
+            else:
+                item = (image_path, None, None, error)
+            stats.add(wait_output=_timed_put(computed, item))
+
+    def writer():
+        stats = stages["写出"]
+        remaining = compute_workers
+        while remaining:
+            item, waited = _timed_get(computed)
+            stats.add(wait_input=waited)
+            if item is _DONE:
+                remaining -= 1
+                continue
+            image_path, data, regions, error = item
+            if error is not None:
+                record(image_path, None, error)
+                continue
+            start = time.perf_counter()
+            # 任何异常都只记录到该图片：写出线程退出会使计算线程阻塞在已满的写出队列上
+            try:
+                output_path = output_path_for(image_path, output_dir)
+                write_map(output_path, data, regions)
+                record(image_path, output_path, None)
+            except Exception as e:
+                record(image_path, None, f"写出失败: {e}")
+            stats.add(busy=time.perf_counter() - start, items=1)
+
+    executor = ProcessPoolExecutor(max_workers=compute_workers) if use_processes else None
+    start = time.perf_counter()
+    try:
+        threads = [threading.Thread(target=decoder, name="decode")]
+        threads += [threading.Thread(target=computer, name=f"compute-{i}") for i in range(compute_workers)]
+        threads.append(threading.Thread(target=writer, name="write"))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return [results[path] for path in image_paths], stages, wall
+
+
+def run_sequential(image_paths, output_dir, options):
+    """顺序执行（对比用）：每张图依次解码、计算、写出"""
+    os.makedirs(output_dir, exist_ok=True)
+    stages = {name: StageStats(name) for name in ("解码", "计算", "写出")}
+    results = []
+    start = time.perf_counter()
+    for image_path in image_paths:
+        try:
+            step = time.perf_counter()
+            image = decode_image(image_path)
+            stages["解码"].add(busy=time.perf_counter() - step, items=1)
+
+            step = time.perf_counter()
+            data, regions = compute_map(image, options)
+            stages["计算"].add(busy=time.perf_counter() - step, items=1)
+
+            step = time.perf_counter()
+            output_path = output_path_for(image_path, output_dir)
+            write_map(output_path, data, regions)
+            stages["写出"].add(busy=time.perf_counter() - step, items=1)
+            results.append((image_path, output_path, None))
+        except Exception as e:
+            results.append((image_path, None, str(e)))
+    return results, stages, time.perf_counter() - start
+
+
+def print_batch_report(results, stages, wall, title="流水线"):
+    print(f"\n=== {title}：{len(results)} 张图片，总耗时 {wall:.2f}s ===")
+    for image_path, output_path, error in results:
+        print(f"  {image_path} => {output_path if error is None else error}")
+    print("各阶段（忙碌占比高的阶段即瓶颈）：")
+    for stats in stages.values():
+        print(f"  {stats.name}（{stats.workers} 线程）: {stats.items} 项, 忙碌 {stats.busy:.2f}s, "
+              f"占比 {stats.utilization(wall) * 100:.1f}%, 等待输入 {stats.wait_input:.2f}s, 等待下游 {stats.wait_output:.2f}s")
+    bottleneck = max(stages.values(), key=lambda stats: stats.utilization(wall))
+    print(f"瓶颈: {bottleneck.name}")
+
+
+def main():
+    pattern = input("请输入图片目录或通配符（默认当前目录下的所有图片）：").strip() or "."
+    image_paths = collect_images(pattern)
+    if not image_paths:
+        print(f"没有找到匹配 {pattern} 的图片！")
+        return
+    print(f"共 {len(image_paths)} 张图片")
+
+    output_dir = input("请输入输出目录（默认 batch_output）：").strip() or "batch_output"
+    size_input = input("请输入尺寸（格式：(1, 宽度*高度) 或 (2, 宽度*高度)，默认 30*20）：").strip() or "30*20"
+    sampling_method = input("请输入取样方式（1: 网格内所有像素平均, 2: 网格中心点范围平均, 默认1）：").strip()
+    sampling_type = input("请输入取样种类（1: 仅地形和高度数据, 2: 所有数据, 默认1）：").strip()
+    region_input = input(f"是否进行区域分析（y 为封闭水域小于 {DEFAULT_LAKE_MAX_SIZE} 个单元格视为湖泊，也可直接输入该数值，默认 n 跳过）：")
+    options = {
+        "size_input": size_input,
+        "sampling_method": int(sampling_method) if sampling_method else 1,
+        "sampling_type": int(sampling_type) if sampling_type else 1,
+        "lake_max_size": parse_lake_input(region_input),
+        "normalize_height": input("是否填满高度（y/n，默认 y）：").strip().lower() != 'n',
+    }
+
+    compute_workers = input(f"请输入计算线程数（默认 {DEFAULT_COMPUTE_WORKERS}）：").strip()
+    compute_workers = int(compute_workers) if compute_workers else DEFAULT_COMPUTE_WORKERS
+    use_processes = input("请选择计算方式（1: 进程池, 2: 仅线程，默认 1）：").strip() != "2"
+    decode_depth = input(f"请输入解码队列深度（默认 {DEFAULT_DECODE_DEPTH}）：").strip()
+    decode_depth = int(decode_depth) if decode_depth else DEFAULT_DECODE_DEPTH
+    write_depth = input(f"请输入写出队列深度（默认 {DEFAULT_WRITE_DEPTH}）：").strip()
+    write_depth = int(write_depth) if write_depth else DEFAULT_WRITE_DEPTH
+    compare = input("是否与顺序执行对比耗时（y/n，默认 n）：").strip().lower() == 'y'
+
+    if compare:
+        print_batch_report(*run_sequential(image_paths, output_dir, options), title="顺序执行")
+    print_batch_report(*run_batch(image_paths, output_dir, options, compute_workers, decode_depth, write_depth,
+                                     use_processes))
+
+    input("\n已结束，回车可关闭窗口")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
+import glob
 import json
 import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from __mapCodec import (CODECS, DEFAULT_CODEC, DEFAULT_BLOCK_ROWS, MAGIC_BLOCKS, MapBlockReader, encode_map, decode_map_to_json, encode_map_blocks,
+                        read_header, shorten_fields, benchmark_codecs, print_benchmark, benchmark_region_query, print_region_benchmark)
+
+# 批量压缩时可选的编解码器：json-min 为原有的“字段名缩写+去空白”
+BATCH_CODECS = ("json-min",) + tuple(CODECS)
+# 批量压缩时跳过本工具自己生成的文件
+BATCH_OUTPUT_SUFFIXES = ("_compressed", "_restored", "_blocks")
 
 def compress_json(input_file, compress_format=True, compress_fields=True):
     # 读取原始JSON文件
@@ -57,17 +69,226 @@ def compress_json(input_file, compress_format=True, compress_fields=True):
 
     print(f"\n压缩后的文件已保存为: {output_file}")
 
+def compress_json_codec(input_file, codec=DEFAULT_CODEC):
+    """列式编码压缩：推断网格后去掉坐标，按列做 RLE/差分/变长编码，再整体压缩"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    data = json.loads(text)
+
+    original_size = os.path.getsize(input_file)
+    print(f"原始文件大小: {original_size} 字节")
+
+    blob = encode_map(data, codec, text)
+
+    # 生成新文件名
+    base_name, _ = os.path.splitext(input_file)
+    output_file = f"{base_name}_compressed.hxm"
+    with open(output_file, 'wb') as f:
+        f.write(blob)
+
+    # 校验解码结果与原文件一致
+    if decode_map_to_json(blob) != text:
+        print("警告：解码结果与原文件不一致！")
+
+    compressed_size = len(blob)
+    print(f"\n压缩后文件大小: {compressed_size} 字节")
+    print(f"压缩率: {(original_size - compressed_size) / original_size * 100:.2f}%")
+    print(f"\n压缩后的文件已保存为: {output_file}")
+    return output_file
+
+def compress_json_blocks(input_file, codec=DEFAULT_CODEC, block_rows=DEFAULT_BLOCK_ROWS):
+    """分块列式编码：每块独立压缩并写入块索引，可用 MapBlockReader 按区域读取"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    data = json.loads(text)
+
+    original_size = os.path.getsize(input_file)
+    print(f"原始文件大小: {original_size} 字节")
+
+    blob = encode_map_blocks(data, codec, block_rows, text)
+
+    base_name, _ = os.path.splitext(input_file)
+    output_file = f"{base_name}_blocks.hxm"
+    with open(output_file, 'wb') as f:
+        f.write(blob)
+
+    compressed_size = len(blob)
+    print(f"\n压缩后文件大小: {compressed_size} 字节")
+    print(f"压缩率: {(original_size - compressed_size) / original_size * 100:.2f}%")
+    print(f"\n分块文件已保存为: {output_file}")
+    return output_file
+
+def decompress_json_codec(input_file):
+    """将列式编码文件还原为原始JSON"""
+    with open(input_file, 'rb') as f:
+        blob = f.read()
+    if blob[-4:] == MAGIC_BLOCKS:
+        with MapBlockReader(input_file) as reader:
+            text = reader.read_json()
+    else:
+        text = decode_map_to_json(blob)
+
+    base_name, _ = os.path.splitext(input_file)
+    output_file = f"{base_name}_restored.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    print(f"还原后的文件已保存为: {output_file}")
+    return output_file
+
+def batch_output_path(input_file, codec):
+    """批量压缩的输出文件名"""
+    base_name, ext = os.path.splitext(input_file)
+    return f"{base_name}_compressed{ext if codec == 'json-min' else '.hxm'}"
+
+def is_batch_output_fresh(input_file, output_file, codec):
+    """输出比源文件新且由同一编解码器生成（读取 .hxm 文件头中的 codec）时视为已是最新"""
+    if not os.path.exists(output_file) or os.path.getmtime(output_file) < os.path.getmtime(input_file):
+        return False
+    if codec == "json-min":
+        return True
+    try:
+        with open(output_file, 'rb') as f:
+            head = f.read(8)
+            header, _ = read_header(head + f.read(struct.unpack_from("<I", head, 4)[0]))
+    except (OSError, ValueError, struct.error):
+        return False
+    return header.get("codec") == codec
+
+def collect_batch_files(pattern):
+    """目录则递归匹配其中的 .json，否则按通配符匹配；排除本工具生成的文件"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.json")
+    files = sorted(glob.glob(pattern, recursive=True))
+    return [f for f in files if os.path.isfile(f)
+            and not os.path.splitext(f)[0].endswith(BATCH_OUTPUT_SUFFIXES)]
+
+def _batch_compress_file(input_file, codec):
+    """批量压缩的子进程任务：压缩单个文件，返回统计结果"""
+    start = time.perf_counter()
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    data = json.loads(text)
+
+    if codec == "json-min":
+        blob = json.dumps(shorten_fields(data)[1], separators=(',', ':')).encode('utf-8')
+    else:
+        blob = encode_map(data, codec, text)
+
+    output_file = batch_output_path(input_file, codec)
+    with open(output_file, 'wb') as f:
+        f.write(blob)
+
+    return {
+        "file": input_file,
+        "before": os.path.getsize(input_file),
+        "after": len(blob),
+        "seconds": time.perf_counter() - start,
+        "status": "压缩",
+    }
+
+def compress_batch(pattern, codec=DEFAULT_CODEC, workers=None, force=False):
+    """
+    批量压缩：在进程池中压缩目录或通配符匹配到的所有JSON文件
+    :param pattern: 目录或通配符（如 maps/**/exported_map_data*.json）
+    :param codec: BATCH_CODECS 中的名称
+    :param workers: 进程数（默认 CPU 核数）
+    :param force: 为 True 时不跳过已是最新的文件
+    :return: 每个文件的统计结果列表（按文件名排序）
+    """
+    if codec not in BATCH_CODECS:
+        raise ValueError(f"未知的编解码器: {codec}，可选: {', '.join(BATCH_CODECS)}")
+
+    files = collect_batch_files(pattern)
+    results = []
+    pending = []
+    for input_file in files:
+        output_file = batch_output_path(input_file, codec)
+        # 输出比源文件新且编解码器相同，说明已压缩过，跳过
+        if not force and is_batch_output_fresh(input_file, output_file, codec):
+            results.append({
+                "file": input_file,
+                "before": os.path.getsize(input_file),
+                "after": os.path.getsize(output_file),
+                "seconds": 0.0,
+                "status": "跳过",
+            })
+        else:
+            pending.append(input_file)
+
+    start = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_batch_compress_file, f, codec): f for f in pending}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"file": futures[future], "before": os.path.getsize(futures[future]),
+                                    "after": 0, "seconds": 0.0, "status": f"失败: {e}"})
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r["file"])
+    print_batch_results(results, codec, elapsed)
+    return results
+
+def print_batch_results(results, codec, elapsed):
+    """以表格形式打印批量压缩结果"""
+    print(f"\n=== 批量压缩结果（编解码器 {codec}）===")
+    print(f"{'文件':<50}{'压缩前':>12}{'压缩后':>12}{'压缩比':>10}{'耗时(s)':>10}  状态")
+    total_before = total_after = 0
+    for r in results:
+        ratio = r["before"] / r["after"] if r["after"] else 0.0
+        print(f"{r['file']:<50}{r['before']:>12}{r['after']:>12}{ratio:>10.2f}{r['seconds']:>10.3f}  {r['status']}")
+        if r["after"]:
+            total_before += r["before"]
+            total_after += r["after"]
+    total_ratio = total_before / total_after if total_after else 0.0
+    print(f"{'合计':<50}{total_before:>12}{total_after:>12}{total_ratio:>10.2f}{elapsed:>10.3f}")
+
 def main():
     # 提示用户输入文件名
-    input_file = input("请输入要压缩的JSON文件名（默认 map_data.json，直接回车使用默认值）：")
+    input_file = input("请输入要压缩的JSON文件名（默认 map_data.json，直接回车使用默认值；输入目录或通配符如 maps/*.json 则批量压缩）：")
     if not input_file:
         input_file = "map_data.json"
 
+    # 批量压缩：输入为目录或通配符
+    if os.path.isdir(input_file) or glob.has_magic(input_file):
+        codec = input(f"请选择编解码器（{', '.join(BATCH_CODECS)}，默认 {DEFAULT_CODEC}）：").strip() or DEFAULT_CODEC
+        workers = input("请输入进程数（默认 CPU 核数）：").strip()
+        force = input("是否重新压缩已是最新的文件 (y/n，默认 n): ").strip().lower() == 'y'
+        compress_batch(input_file, codec, int(workers) if workers else None, force)
+        input("\n已结束，回车可关闭窗口")
+        return
+
     # 检查文件是否存在
     if not os.path.exists(input_file):
         print(f"文件 {input_file} 不存在！")
         return
 
+    # 提示用户选择压缩方式
+    mode = input("请选择压缩方式（1: 字段名缩写+去空白, 2: 列式编码, 3: 列式编码还原为JSON, 4: 对比各编解码器, "
+                 "5: 分块列式编码, 6: 对比区域查询与完整解码, 默认 1）：").strip()
+    if mode in ("2", "4", "5", "6"):
+        if mode in ("2", "5", "6"):
+            codec = input(f"请选择编解码器（{', '.join(CODECS)}，默认 {DEFAULT_CODEC}）：").strip() or DEFAULT_CODEC
+        if mode in ("5", "6"):
+            block_rows = input(f"请输入每块行数（默认 {DEFAULT_BLOCK_ROWS}）：").strip()
+            block_rows = int(block_rows) if block_rows else DEFAULT_BLOCK_ROWS
+        if mode == "2":
+            compress_json_codec(input_file, codec)
+        elif mode == "4":
+            print_benchmark(input_file, benchmark_codecs(input_file))
+        elif mode == "5":
+            compress_json_blocks(input_file, codec, block_rows)
+        else:
+            print_region_benchmark(input_file, benchmark_region_query(input_file, codec, block_rows))
+        input("\n已结束，回车可关闭窗口")
+        return
+    if mode == "3":
+        decompress_json_codec(input_file)
+        input("\n已结束，回车可关闭窗口")
+        return
+
     # 提示用户是否压缩格式
     compress_format = input("是否压缩格式（去除换行符、空格等）(y/n，默认 y): ")
     if compress_format.lower() != 'n':
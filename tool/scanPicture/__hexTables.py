@@ -0,0 +1,163 @@
+# pip install numpy # 本程序所需插件
+# ----------------------------------------
+# 六边形网格索引表与邻接表（随地图数据一起输出，供运行时寻路、河流、道路生成使用）
+# 坐标约定与 game/src/terrain/HexGridUtils.ts 一致：
+#   generateHexGrid: q 外层 [0, width)，r 内层 [-(q >> 1), height - (q >> 1))
+#   getNeighbors:    directions = [1,0], [1,-1], [0,-1], [-1,0], [-1,1], [0,1]
+# 输出文件格式（小端）：
+#   0   char[4]  magic "HXNB"
+#   4   uint16   版本号
+#   6   uint16   每个单元格的邻居数（6）
+#   8   int32    单元格数量 count
+#   12  int32    q_min
+#   16  int32    r_min
+#   20  int32    q_span
+#   24  int32    r_span
+#   28  Int32[q_span * r_span]  索引表：table[(q - q_min) * r_span + (r - r_min)] = 单元格下标，不存在为 -1
+#   ..  Int32[count * 6]        邻接表：neighbors[i * 6 + d] = 第 d 个方向的邻居下标，越界为 -1
+# ----------------------------------------
+import os
+import struct
+
+import numpy as np
+
+HEX_DIRECTIONS = np.array([
+    [1, 0], [1, -1], [0, -1],
+    [-1, 0], [-1, 1], [0, 1]
+], dtype=np.int32)
+
+MAGIC = b"HXNB"
+VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHiiiii")
+
+
+def generate_hex_grid(width, height):
+    """
+    生成六边形网格坐标（向量化版的 HexGridUtils.generateHexGrid，顺序一致）
+    :return: (qs, rs) Int32 数组
+    """
+    qs = np.repeat(np.arange(width, dtype=np.int32), height)
+    rs = np.tile(np.arange(height, dtype=np.int32), width) - (qs >> 1)
+    return qs, rs
+
+
+def build_index_table(qs, rs):
+    """
+    生成稠密的 q/r => 单元格下标 表
+    :param qs: 各单元格的 q 坐标（数组下标即单元格下标）
+    :param rs: 各单元格的 r 坐标
+    :return: (table, q_min, r_min)，table 形状为 (q_span, r_span)，不存在的位置为 -1
+    """
+    qs = np.asarray(qs, dtype=np.int64)
+    rs = np.asarray(rs, dtype=np.int64)
+    if qs.size == 0:
+        return np.full((0, 0), -1, dtype=np.int32), 0, 0
+
+    q_min, r_min = int(qs.min()), int(rs.min())
+    q_span = int(qs.max()) - q_min + 1
+    r_span = int(rs.max()) - r_min + 1
+    table = np.full((q_span, r_span), -1, dtype=np.int32)
+    table[qs - q_min, rs - r_min] = np.arange(qs.size, dtype=np.int32)
+    return table, q_min, r_min
+
+
+def build_neighbors(qs, rs, table=None, q_min=None, r_min=None):
+    """
+    生成邻接表（每个单元格 6 个方向，越界或不存在为 -1）
+    :return: Int32 数组，形状为 (count, 6)
+    """
+    qs = np.asarray(qs, dtype=np.int64)
+    rs = np.asarray(rs, dtype=np.int64)
+    if table is None:
+        table, q_min, r_min = build_index_table(qs, rs)
+    q_span, r_span = table.shape
+
+    nq = qs[:, np.newaxis] + HEX_DIRECTIONS[:, 0] - q_min
+    nr = rs[:, np.newaxis] + HEX_DIRECTIONS[:, 1] - r_min
+    inside = (nq >= 0) & (nq < q_span) & (nr >= 0) & (nr < r_span)
+    neighbors = np.full(nq.shape, -1, dtype=np.int32)
+    neighbors[inside] = table[nq[inside], nr[inside]]
+    return neighbors
+
+
+def encode_hex_tables(qs, rs):
+    """将索引表与邻接表打包为字节"""
+    table, q_min, r_min = build_index_table(qs, rs)
+    neighbors = build_neighbors(qs, rs, table, q_min, r_min)
+    q_span, r_span = table.shape
+    header = HEADER_STRUCT.pack(MAGIC, VERSION, len(HEX_DIRECTIONS), len(neighbors), q_min, r_min, q_span, r_span)
+    return header + table.astype("<i4").tobytes() + neighbors.astype("<i4").tobytes()
+
+
+def decode_hex_tables(blob):
+    """encode_hex_tables 的逆运算，返回 (table, q_min, r_min, neighbors)"""
+    magic, _, directions, count, q_min, r_min, q_span, r_span = HEADER_STRUCT.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("不是六边形邻接表文件")
+    offset = HEADER_STRUCT.size
+    table = np.frombuffer(blob, "<i4", q_span * r_span, offset).reshape(q_span, r_span)
+    offset += table.nbytes
+    neighbors = np.frombuffer(blob, "<i4", count * directions, offset).reshape(count, directions)
+    return table, q_min, r_min, neighbors
+
+
+def save_hex_tables(map_file, qs, rs):
+    """在地图数据旁写入邻接表文件（map_data.json => map_data_neighbors.bin），返回文件路径"""
+    base_name, _ = os.path.splitext(map_file)
+    output_file = f"{base_name}_neighbors.bin"
+    with open(output_file, "wb") as f:
+        f.write(encode_hex_tables(qs, rs))
+    return output_file
+
+
+# ----------------------------------------
+# 纯 Python 参考实现：逐条照搬 HexGridUtils 的规则，用于校验向量化结果
+# ----------------------------------------
+def reference_hex_grid(width, height):
+    grid = []
+    for q in range(width):
+        offset = q >> 1
+        for r in range(-offset, height - offset):
+            grid.append((q, r))
+    return grid
+
+
+def reference_neighbors(cells):
+    """运行时的做法：以 `${q},${r}` 为键查 Map，再对 getNeighbors 的结果逐个查找"""
+    directions = [[1, 0], [1, -1], [0, -1], [-1, 0], [-1, 1], [0, 1]]
+    index = {f"{q},{r}": i for i, (q, r) in enumerate(cells)}
+    return [[index.get(f"{q + dq},{r + dr}", -1) for dq, dr in directions] for q, r in cells]
+
+
+def verify_against_reference(width, height):
+    """校验向量化生成的网格与邻接表与参考实现完全一致"""
+    qs, rs = generate_hex_grid(width, height)
+    cells = reference_hex_grid(width, height)
+    if list(zip(qs.tolist(), rs.tolist())) != cells:
+        return False
+    if build_neighbors(qs, rs).tolist() != reference_neighbors(cells):
+        return False
+    table, q_min, r_min, neighbors = decode_hex_tables(encode_hex_tables(qs, rs))
+    return all(table[q - q_min, r - r_min] == i for i, (q, r) in enumerate(cells)) \
+        and neighbors.tolist() == reference_neighbors(cells)
+
+
+def main():
+    # 先用多组尺寸与参考实现对比，确认坐标约定一致
+    for width, height in [(1, 1), (2, 3), (5, 4), (20, 20), (33, 17)]:
+        ok = verify_against_reference(width, height)
+        print(f"校验 {width}*{height}: {'通过' if ok else '失败'}")
+        if not ok:
+            return
+
+    size_input = input("请输入地图尺寸（格式：宽度*高度，默认 20*20）：").strip() or "20*20"
+    width, height = map(int, size_input.split("*"))
+    qs, rs = generate_hex_grid(width, height)
+    output_file = save_hex_tables(f"hex_grid_{width}x{height}.json", qs, rs)
+    print(f"邻接表已保存到: {output_file}（{os.path.getsize(output_file)} 字节）")
+
+    input("\n已结束，回车可关闭窗口")
+
+
+if __name__ == "__main__":
+    main()
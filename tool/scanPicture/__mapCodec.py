@@ -0,0 +1,601 @@
+import json
+import lzma
+import os
+import random
+import struct
+import tempfile
+import time
+import zlib
+
+# ----------------------------------------
+# 地图数据列式编码（供 __depressJson.py 使用）
+# 文件格式：
+#   MAGIC(4字节) + 头部长度(uint32, 小端) + 头部JSON(utf-8) + 压缩后的列数据
+# 头部记录：单元格数量、字段顺序、网格布局、原始JSON格式、每列的编码方式与字节数
+# ----------------------------------------
+
+MAGIC = b"HXMC"
+VERSION = 1
+
+# ----------------------------------------
+# 分块格式（支持按区域读取）：
+#   MAGIC_BLOCKS(4字节) + 各块压缩数据 + 索引JSON(utf-8) + 索引长度(uint32, 小端) + MAGIC_BLOCKS(4字节)
+# 每块独立压缩，索引记录每块的偏移、大小、单元格范围与 x/y 包围盒
+# ----------------------------------------
+MAGIC_BLOCKS = b"HXMB"
+DEFAULT_BLOCK_ROWS = 16
+
+# 可选的整体压缩后端
+BACKENDS = {
+    "zlib": (lambda raw: zlib.compress(raw, 9), zlib.decompress),
+    "lzma": (lambda raw: lzma.compress(raw, preset=9 | lzma.PRESET_EXTREME), lzma.decompress),
+    "none": (bytes, bytes),
+}
+
+# 编解码器名称 => 压缩后端
+CODECS = {
+    "col-zlib": "zlib",
+    "col-lzma": "lzma",
+    "col-none": "none",
+}
+DEFAULT_CODEC = "col-zlib"
+
+# 列编码方式：rle（游程，适合地形）、delta（差分，适合高度）、varint（变长整数）
+COLUMN_ENCODINGS = ("rle", "delta", "varint")
+
+# 原始JSON可能使用的格式，解码时按相同格式还原文本
+JSON_FORMATS = (
+    {"indent": 4},
+    {"indent": 2},
+    {"separators": [",", ":"]},
+    {},
+)
+
+
+def _zigzag(value):
+    """有符号整数 => 无符号整数（0, -1, 1, -2 ... => 0, 1, 2, 3 ...）"""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    """_zigzag 的逆运算"""
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_varint(out, value):
+    """以 LEB128 变长格式写入无符号整数"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos):
+    """读取一个变长整数，返回 (值, 新位置)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_column(values, encoding):
+    """
+    将整数列编码为字节
+    :param values: 整数列表
+    :param encoding: rle / delta / varint
+    :return: bytes
+    """
+    out = bytearray()
+    if encoding == "varint":
+        for v in values:
+            _write_varint(out, _zigzag(v))
+    elif encoding == "delta":
+        prev = 0
+        for v in values:
+            _write_varint(out, _zigzag(v - prev))
+            prev = v
+    elif encoding == "rle":
+        i = 0
+        n = len(values)
+        while i < n:
+            v = values[i]
+            j = i + 1
+            while j < n and values[j] == v:
+                j += 1
+            _write_varint(out, _zigzag(v))
+            _write_varint(out, j - i)
+            i = j
+    else:
+        raise ValueError(f"未知的列编码方式: {encoding}")
+    return bytes(out)
+
+
+def decode_column(buf, encoding, count):
+    """
+    encode_column 的逆运算
+    :param buf: 列字节
+    :param encoding: rle / delta / varint
+    :param count: 单元格数量
+    :return: 整数列表
+    """
+    values = []
+    pos = 0
+    if encoding == "varint":
+        for _ in range(count):
+            v, pos = _read_varint(buf, pos)
+            values.append(_unzigzag(v))
+    elif encoding == "delta":
+        prev = 0
+        for _ in range(count):
+            v, pos = _read_varint(buf, pos)
+            prev += _unzigzag(v)
+            values.append(prev)
+    elif encoding == "rle":
+        while len(values) < count:
+            v, pos = _read_varint(buf, pos)
+            run, pos = _read_varint(buf, pos)
+            values.extend([_unzigzag(v)] * run)
+    else:
+        raise ValueError(f"未知的列编码方式: {encoding}")
+    return values
+
+
+def _is_int_column(values):
+    # bool 是 int 的子类，需要排除，否则还原后 true 会变成 1
+    return all(type(v) is int for v in values)
+
+
+def _encode_best(values):
+    """对整数列尝试所有编码方式，返回最小的 (编码方式, 字节)"""
+    best = None
+    for encoding in COLUMN_ENCODINGS:
+        encoded = encode_column(values, encoding)
+        if best is None or len(encoded) < len(best[1]):
+            best = (encoding, encoded)
+    return best
+
+
+def infer_layout(xs, ys):
+    """
+    根据 x/y 推断网格布局，能推断时坐标无需存储
+    rows: 按行排列（__scanPictureToMap.py 的输出顺序）
+    hex:  HexGridUtils.generateHexGrid 的顺序（q 外层，r 从 -(q>>1) 开始）
+    explicit: 无法推断，x/y 作为普通列存储
+    :return: 布局字典
+    """
+    count = len(xs)
+    if count == 0:
+        return {"type": "explicit"}
+
+    min_x, max_x = min(xs), max(xs)
+    width = max_x - min_x + 1
+    if count % width == 0:
+        height = count // width
+        min_y = min(ys)
+        layout = {"type": "rows", "x0": min_x, "y0": min_y, "width": width, "height": height}
+        if all(xs[i] == min_x + i % width and ys[i] == min_y + i // width for i in range(count)):
+            return layout
+
+    if min_x == 0 and count % width == 0:
+        height = count // width
+        layout = {"type": "hex", "width": width, "height": height}
+        if all(xs[i] == i // height and ys[i] == i % height - ((i // height) >> 1) for i in range(count)):
+            return layout
+
+    return {"type": "explicit"}
+
+
+def layout_coords(layout, start, stop):
+    """按布局还原 [start, stop) 范围内单元格的坐标"""
+    if layout["type"] == "rows":
+        x0, y0, width = layout["x0"], layout["y0"], layout["width"]
+        return ([x0 + i % width for i in range(start, stop)],
+                [y0 + i // width for i in range(start, stop)])
+    if layout["type"] == "hex":
+        height = layout["height"]
+        return ([i // height for i in range(start, stop)],
+                [i % height - ((i // height) >> 1) for i in range(start, stop)])
+    raise ValueError(f"布局 {layout['type']} 无法推导坐标")
+
+
+def _detect_json_format(text, data):
+    """找出与原始文本完全一致的 json.dumps 参数，找不到时返回 None"""
+    body = text.rstrip("\n")
+    for fmt in JSON_FORMATS:
+        if json.dumps(data, **fmt) == body:
+            return {"dumps": fmt, "trailing": text[len(body):]}
+    return None
+
+
+def encode_columns(data, layout):
+    """
+    按列编码单元格列表（不含整体压缩）
+    :param data: 单元格字典列表
+    :param layout: infer_layout 的结果
+    :return: (列描述列表, 拼接后的列字节)
+    """
+    keys = list(data[0].keys()) if data else []
+    for item in data:
+        if list(item.keys()) != keys:
+            raise ValueError("单元格字段不一致，无法按列编码")
+
+    skip = {"x", "y"} if layout["type"] != "explicit" else set()
+    columns = []
+    payload = bytearray()
+    for key in keys:
+        if key in skip:
+            continue
+        values = [item[key] for item in data]
+        if _is_int_column(values):
+            encoding, encoded = _encode_best(values)
+        else:
+            encoding, encoded = "json", json.dumps(values, separators=(",", ":")).encode("utf-8")
+        columns.append({"key": key, "enc": encoding, "size": len(encoded)})
+        payload += encoded
+    return columns, bytes(payload)
+
+
+def decode_columns(columns, payload, keys, layout, start, stop):
+    """
+    encode_columns 的逆运算，返回 [start, stop) 范围的单元格列表
+    """
+    count = stop - start
+    values = {}
+    pos = 0
+    for column in columns:
+        chunk = payload[pos:pos + column["size"]]
+        pos += column["size"]
+        if column["enc"] == "json":
+            values[column["key"]] = json.loads(chunk.decode("utf-8"))
+        else:
+            values[column["key"]] = decode_column(chunk, column["enc"], count)
+
+    if layout["type"] != "explicit":
+        values["x"], values["y"] = layout_coords(layout, start, stop)
+
+    return [{key: values[key][i] for key in keys} for i in range(count)]
+
+
+def encode_map(data, codec=DEFAULT_CODEC, text=None):
+    """
+    将地图数据编码为列式压缩字节
+    :param data: 单元格字典列表（map_data.json 的内容）
+    :param codec: CODECS 中的名称
+    :param text: 原始JSON文本，提供时解码可逐字节还原
+    :return: bytes
+    """
+    if codec not in CODECS:
+        raise ValueError(f"未知的编解码器: {codec}，可选: {', '.join(CODECS)}")
+    compress, _ = BACKENDS[CODECS[codec]]
+
+    xs = [item.get("x") for item in data]
+    ys = [item.get("y") for item in data]
+    if _is_int_column(xs) and _is_int_column(ys):
+        layout = infer_layout(xs, ys)
+    else:
+        layout = {"type": "explicit"}
+
+    columns, payload = encode_columns(data, layout)
+    header = {
+        "version": VERSION,
+        "codec": codec,
+        "count": len(data),
+        "keys": list(data[0].keys()) if data else [],
+        "layout": layout,
+        "columns": columns,
+        "format": _detect_json_format(text, data) if text is not None else None,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + compress(payload)
+
+
+def read_header(blob):
+    """读取文件头，返回 (头部字典, 数据起始位置)"""
+    if blob[:4] != MAGIC:
+        raise ValueError("不是列式编码的地图文件")
+    (header_size,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + header_size].decode("utf-8"))
+    return header, 8 + header_size
+
+
+def decode_map(blob):
+    """encode_map 的逆运算，返回单元格字典列表"""
+    header, offset = read_header(blob)
+    _, decompress = BACKENDS[CODECS[header["codec"]]]
+    payload = decompress(blob[offset:])
+    return decode_columns(header["columns"], payload, header["keys"], header["layout"], 0, header["count"])
+
+
+def decode_map_to_json(blob):
+    """解码并按原始格式输出JSON文本（编码时提供了原文本则逐字节一致）"""
+    header, _ = read_header(blob)
+    data = decode_map(blob)
+    fmt = header["format"]
+    if fmt is None:
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, **fmt["dumps"]) + fmt["trailing"]
+
+
+def shorten_fields(data):
+    """原有的压缩方式：字段名取首字母（冲突时逐步加长），返回 (映射, 压缩后的数据)"""
+    field_mapping = {}
+    if data:
+        for key in data[0].keys():
+            short_key = key[0]  # 取首字母
+            # 处理冲突
+            while short_key in field_mapping.values():
+                short_key = key[:len(short_key) + 1]
+            field_mapping[key] = short_key
+    return field_mapping, [{field_mapping[k]: v for k, v in item.items()} for item in data]
+
+
+def benchmark_codecs(input_file, repeat=3):
+    """
+    对比各编解码器的压缩率与编解码速度
+    :param input_file: 地图JSON文件
+    :param repeat: 重复次数（取最快一次）
+    :return: 结果列表，每项包含 codec / size / ratio / encode_mbps / decode_mbps
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    data = json.loads(text)
+    original_size = len(text.encode("utf-8"))
+    megabytes = original_size / (1024 * 1024)
+
+    def best_time(func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result, max(best, 1e-9)
+
+    results = []
+
+    # 基准：原有的“字段名缩写 + 去除空白”
+    _, short_data = shorten_fields(data)
+    encoded, encode_time = best_time(lambda: json.dumps(shorten_fields(json.loads(text))[1], separators=(",", ":")))
+    _, decode_time = best_time(lambda: json.loads(encoded))
+    results.append({
+        "codec": "json-min",
+        "size": len(encoded.encode("utf-8")),
+        "encode_mbps": megabytes / encode_time,
+        "decode_mbps": megabytes / decode_time,
+        "exact": json.loads(encoded) == short_data,
+    })
+
+    for codec in CODECS:
+        blob, encode_time = best_time(lambda: encode_map(json.loads(text), codec, text))
+        restored, decode_time = best_time(lambda: decode_map_to_json(blob))
+        results.append({
+            "codec": codec,
+            "size": len(blob),
+            "encode_mbps": megabytes / encode_time,
+            "decode_mbps": megabytes / decode_time,
+            "exact": restored == text,
+        })
+
+    for row in results:
+        row["ratio"] = original_size / row["size"] if row["size"] else 0.0
+    return results
+
+
+def print_benchmark(input_file, results):
+    """以表格形式打印 benchmark_codecs 的结果"""
+    print(f"\n=== 编解码器对比: {input_file}（原始 {os.path.getsize(input_file)} 字节）===")
+    print(f"{'编解码器':<10}{'大小(字节)':>12}{'压缩比':>10}{'编码MB/s':>12}{'解码MB/s':>12}{'还原一致':>10}")
+    for row in results:
+        print(f"{row['codec']:<12}{row['size']:>12}{row['ratio']:>10.2f}"
+              f"{row['encode_mbps']:>12.2f}{row['decode_mbps']:>12.2f}{'是' if row['exact'] else '否':>10}")
+    best = min((r for r in results if r["exact"]), key=lambda r: r["size"], default=None)
+    if best:
+        print(f"体积最小: {best['codec']}")
+
+
+def _block_cells(layout, block_rows):
+    """每块包含的单元格数量：rows 布局按行、hex 布局按列（q）分块"""
+    if layout["type"] == "rows":
+        return block_rows * layout["width"]
+    if layout["type"] == "hex":
+        return block_rows * layout["height"]
+    return block_rows * 64
+
+
+def encode_map_blocks(data, codec=DEFAULT_CODEC, block_rows=DEFAULT_BLOCK_ROWS, text=None):
+    """
+    将地图数据按块编码，每块独立压缩，末尾写入块索引
+    :param data: 单元格字典列表
+    :param codec: CODECS 中的名称
+    :param block_rows: 每块包含的行数（hex 布局为列数）
+    :param text: 原始JSON文本，提供时完整解码可逐字节还原
+    :return: bytes
+    """
+    if codec not in CODECS:
+        raise ValueError(f"未知的编解码器: {codec}，可选: {', '.join(CODECS)}")
+    compress, _ = BACKENDS[CODECS[codec]]
+
+    xs = [item.get("x") for item in data]
+    ys = [item.get("y") for item in data]
+    if not (_is_int_column(xs) and _is_int_column(ys)):
+        raise ValueError("分块编码要求 x/y 为整数")
+    layout = infer_layout(xs, ys)
+
+    out = bytearray(MAGIC_BLOCKS)
+    blocks = []
+    step = max(1, _block_cells(layout, block_rows))
+    for start in range(0, len(data), step):
+        stop = min(start + step, len(data))
+        columns, payload = encode_columns(data[start:stop], layout)
+        compressed = compress(payload)
+        blocks.append({
+            "start": start,
+            "count": stop - start,
+            "offset": len(out),
+            "size": len(compressed),
+            "columns": columns,
+            "bounds": [min(xs[start:stop]), min(ys[start:stop]), max(xs[start:stop]), max(ys[start:stop])],
+        })
+        out += compressed
+
+    footer = {
+        "version": VERSION,
+        "codec": codec,
+        "count": len(data),
+        "keys": list(data[0].keys()) if data else [],
+        "layout": layout,
+        "format": _detect_json_format(text, data) if text is not None else None,
+        "block_rows": block_rows,
+        "blocks": blocks,
+    }
+    footer_bytes = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+    out += footer_bytes + struct.pack("<I", len(footer_bytes)) + MAGIC_BLOCKS
+    return bytes(out)
+
+
+class MapBlockReader:
+    """
+    分块地图文件的读取器，按区域查询时只解压与区域重叠的块
+    用法：
+        with MapBlockReader("map_data_blocks.hxm") as reader:
+            cells = reader.query(0, 0, 31, 15)
+    """
+
+    def __init__(self, file_path):
+        self.file = open(file_path, "rb")
+        self.file.seek(-8, os.SEEK_END)
+        tail = self.file.read(8)
+        if tail[4:] != MAGIC_BLOCKS:
+            self.file.close()
+            raise ValueError("不是分块编码的地图文件")
+        (footer_size,) = struct.unpack("<I", tail[:4])
+        self.file.seek(-8 - footer_size, os.SEEK_END)
+        self.footer = json.loads(self.file.read(footer_size).decode("utf-8"))
+        self._decompress = BACKENDS[CODECS[self.footer["codec"]]][1]
+        self.blocks_decoded = 0  # 统计：累计解压的块数
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def count(self):
+        return self.footer["count"]
+
+    def _read_block(self, block):
+        self.file.seek(block["offset"])
+        payload = self._decompress(self.file.read(block["size"]))
+        self.blocks_decoded += 1
+        return decode_columns(block["columns"], payload, self.footer["keys"], self.footer["layout"],
+                              block["start"], block["start"] + block["count"])
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """
+        返回 min_x <= x <= max_x 且 min_y <= y <= max_y 的单元格（按文件顺序）
+        """
+        cells = []
+        for block in self.footer["blocks"]:
+            bx0, by0, bx1, by1 = block["bounds"]
+            if bx1 < min_x or bx0 > max_x or by1 < min_y or by0 > max_y:
+                continue  # 与区域不重叠，跳过解压
+            for cell in self._read_block(block):
+                if min_x <= cell["x"] <= max_x and min_y <= cell["y"] <= max_y:
+                    cells.append(cell)
+        return cells
+
+    def read_all(self):
+        """解压所有块，返回完整的单元格列表"""
+        cells = []
+        for block in self.footer["blocks"]:
+            cells.extend(self._read_block(block))
+        return cells
+
+    def read_json(self):
+        """完整解码并按原始格式输出JSON文本"""
+        data = self.read_all()
+        fmt = self.footer["format"]
+        if fmt is None:
+            return json.dumps(data, separators=(",", ":"))
+        return json.dumps(data, **fmt["dumps"]) + fmt["trailing"]
+
+
+def benchmark_region_query(input_file, codec=DEFAULT_CODEC, block_rows=DEFAULT_BLOCK_ROWS,
+                           region_size=16, queries=50, seed=0):
+    """
+    对比区域查询与完整解码的耗时
+    :param input_file: 地图JSON文件
+    :param region_size: 查询区域的边长（单元格）
+    :param queries: 随机查询次数
+    :return: 结果字典（毫秒）
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    data = json.loads(text)
+    xs = [item["x"] for item in data]
+    ys = [item["y"] for item in data]
+    min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+
+    rng = random.Random(seed)
+    regions = []
+    for _ in range(queries):
+        x0 = rng.randint(min_x, max(min_x, max_x - region_size + 1))
+        y0 = rng.randint(min_y, max(min_y, max_y - region_size + 1))
+        regions.append((x0, y0, x0 + region_size - 1, y0 + region_size - 1))
+
+    full_blob = encode_map(data, codec)
+    block_blob = encode_map_blocks(data, codec, block_rows)
+
+    fd, block_path = tempfile.mkstemp(suffix=".hxm")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(block_blob)
+
+        # 完整解码后再筛选区域（保留每次的结果，最后逐一比较）
+        expected = []
+        start = time.perf_counter()
+        for x0, y0, x1, y1 in regions:
+            expected.append([c for c in decode_map(full_blob) if x0 <= c["x"] <= x1 and y0 <= c["y"] <= y1])
+        full_ms = (time.perf_counter() - start) * 1000 / queries
+
+        # 分块读取：只解压重叠的块
+        results = []
+        with MapBlockReader(block_path) as reader:
+            start = time.perf_counter()
+            for x0, y0, x1, y1 in regions:
+                results.append(reader.query(x0, y0, x1, y1))
+            block_ms = (time.perf_counter() - start) * 1000 / queries
+            blocks_per_query = reader.blocks_decoded / queries
+            block_count = len(reader.footer["blocks"])
+    finally:
+        os.remove(block_path)
+
+    return {
+        "full_ms": full_ms,
+        "block_ms": block_ms,
+        "speedup": full_ms / block_ms if block_ms else 0.0,
+        "blocks": block_count,
+        "blocks_per_query": blocks_per_query,
+        "full_size": len(full_blob),
+        "block_size": len(block_blob),
+        "consistent": results == expected,
+    }
+
+
+def print_region_benchmark(input_file, result):
+    """打印 benchmark_region_query 的结果"""
+    print(f"\n=== 区域查询对比: {input_file} ===")
+    print(f"整体编码大小: {result['full_size']} 字节, 分块编码大小: {result['block_size']} 字节（{result['blocks']} 块）")
+    print(f"完整解码+筛选: {result['full_ms']:.3f} ms/次")
+    print(f"分块区域查询: {result['block_ms']:.3f} ms/次（平均解压 {result['blocks_per_query']:.1f} 块）")
+    print(f"加速比: {result['speedup']:.2f}x, 结果一致: {'是' if result['consistent'] else '否'}")
@@ -0,0 +1,257 @@
+# pip install pillow numpy tqdm opencv-python scikit-image scikit-learn # 本程序所需插件（同 __scanPictureToMap.py）
+# ----------------------------------------
+# 进程内流水线：取样 -> （区域分析 / 统计）-> 压缩 -> 渲染
+# 各步骤直接传递内存中的单元格列表，不再经过 map_data.json（indent=4）写出再解析，
+# 只在最后写出需要的产物：压缩文件、邻接表、区域表、预览图（可选再写出 map_data.json）
+# 等价于依次运行 __scanPictureToMap.py、__depressJson.py、__scanDataToPictrue.py
+# ----------------------------------------
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from __hexTables import save_hex_tables
+from __mapCodec import CODECS, DEFAULT_CODEC, decode_map_to_json, encode_map
+from __mapRegions import DEFAULT_LAKE_MAX_SIZE, parse_lake_input, print_regions, save_regions
+from __scanDataToPictrue import create_map_image, load_map_data
+from __scanPictureToMap import (attributes_to_data, build_color_rules, compute_hex_size, extract_attributes,
+                                parse_size_input, print_color_rules, process_map_data, sample_image, show_statistics)
+
+DEFAULT_OUTPUT_NAME = "map_data.json"
+DEFAULT_PREVIEW_NAME = "output_map.png"
+DEFAULT_PREVIEW_SIZE = (4, 4)
+
+
+def scan_image(image, size_input="30*20", sampling_method=1, color_rules=None, sampling_type=1, progress=True):
+    """
+    取样阶段
+    :param image: 图片路径或 PIL 图像
+    :param size_input: 尺寸，格式同 __scanPictureToMap.py（"30*20" 或 "(2, 8*8)"）
+    :param color_rules: 预先提取的颜色分类规则，为 None 时从图片提取
+    :param sampling_type: 2（所有数据）时使用向量化属性提取
+    :param progress: 是否显示取样进度条（服务模式下关闭，避免写入服务端的标准错误）
+    :return: (取样结果, 颜色分类规则, 各阶段耗时)
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    if isinstance(image, str):
+        image = Image.open(image)
+    image = image.convert("RGB")
+    timings["读取图片"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if color_rules is None:
+        color_rules = build_color_rules(image)
+    timings["颜色规则"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size_type, width, height = parse_size_input(size_input)
+    hex_width, hex_height = compute_hex_size(image, size_type, width, height)
+    if sampling_type == 2:
+        data = attributes_to_data(extract_attributes(image, hex_width, hex_height, sampling_method, color_rules))
+    else:
+        data = sample_image(image, hex_width, hex_height, sampling_method, color_rules, progress)
+    timings["取样"] = time.perf_counter() - start
+    return data, color_rules, timings
+
+
+def finish_pipeline(data, sampling_type=1, normalize_height=True, lake_max_size=None, show_stats=False,
+                    codec=DEFAULT_CODEC, preview_size=DEFAULT_PREVIEW_SIZE, output_dir=".", save_json=False):
+    """
+    取样之后的阶段：过滤字段 / 区域分析 / 填满高度 -> 统计 -> 压缩 -> 渲染 -> 写出产物
+    :param lake_max_size: 不为 None 时进行区域分析
+    :param codec: 压缩使用的编解码器（CODECS），为 None 时不压缩
+    :param preview_size: 预览图的六边形网格尺寸 (宽, 高)，为 None 时不渲染
+    :param output_dir: 产物输出目录，为 None 时不写文件（只返回内存中的结果）
+    :param save_json: 是否同时写出 map_data.json（indent=4，与 __scanPictureToMap.py 一致）
+    :return: 结果字典（data / regions / blob / preview / files / timings）
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    data, regions = process_map_data(data, sampling_type, lake_max_size, normalize_height)
+    timings["区域与高度"] = time.perf_counter() - start
+
+    if show_stats:
+        if regions is not None:
+            print_regions(regions)
+        show_statistics(data)
+
+    blob = None
+    if codec is not None:
+        start = time.perf_counter()
+        blob = encode_map(data, codec)
+        timings["压缩"] = time.perf_counter() - start
+
+    preview = None
+    if preview_size is not None:
+        start = time.perf_counter()
+        preview = create_map_image(data, *preview_size)
+        timings["渲染"] = time.perf_counter() - start
+
+    # 只在最后写出产物
+    files = {}
+    if output_dir is not None:
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, DEFAULT_OUTPUT_NAME)
+        base_name, _ = os.path.splitext(output_path)
+        if save_json:
+            with open(output_path, "w") as f:
+                json.dump(data, f, indent=4)
+            files["json"] = output_path
+        if blob is not None:
+            files["compressed"] = f"{base_name}_compressed.hxm"
+            with open(files["compressed"], "wb") as f:
+                f.write(blob)
+        files["neighbors"] = save_hex_tables(output_path, [d["x"] for d in data], [d["y"] for d in data])
+        if regions is not None:
+            files["regions"] = save_regions(output_path, regions)
+        if preview is not None:
+            files["preview"] = os.path.join(output_dir, DEFAULT_PREVIEW_NAME)
+            preview.save(files["preview"])
+        timings["写出"] = time.perf_counter() - start
+
+    return {"data": data, "regions": regions, "blob": blob, "preview": preview, "files": files, "timings": timings}
+
+
+def run_pipeline(image, size_input="30*20", sampling_method=1, sampling_type=1, normalize_height=True,
+                 lake_max_size=None, show_stats=False, codec=DEFAULT_CODEC, preview_size=DEFAULT_PREVIEW_SIZE,
+                 output_dir=".", save_json=False, color_rules=None):
+    """
+    在一个进程内完成取样、压缩、渲染（参数见 scan_image 与 finish_pipeline）
+    :return: 结果字典（data / regions / blob / preview / files / color_rules / timings）
+    """
+    data, color_rules, timings = scan_image(image, size_input, sampling_method, color_rules, sampling_type)
+    result = finish_pipeline(data, sampling_type, normalize_height, lake_max_size, show_stats, codec, preview_size,
+                             output_dir, save_json)
+    result["color_rules"] = color_rules
+    result["timings"] = {**timings, **result["timings"]}
+    return result
+
+
+def run_script_workflow(data, sampling_type=1, normalize_height=True, lake_max_size=None, codec=DEFAULT_CODEC,
+                        preview_size=DEFAULT_PREVIEW_SIZE, output_dir="."):
+    """
+    按原来三个脚本的方式执行取样之后的阶段（用于对比）：写出 map_data.json，
+    压缩脚本读取并解析后压缩（并校验还原），渲染脚本再读取解析一次后出图
+    :param data: scan_image 的取样结果
+    :return: 各阶段耗时字典
+    """
+    timings = {}
+
+    # __scanPictureToMap.py：处理后写出 map_data.json、邻接表、区域表
+    start = time.perf_counter()
+    data, regions = process_map_data(data, sampling_type, lake_max_size, normalize_height)
+    timings["区域与高度"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output_path = os.path.join(output_dir, DEFAULT_OUTPUT_NAME)
+    with open(output_path, "w") as f:
+        json.dump(data, f, indent=4)
+    save_hex_tables(output_path, [d["x"] for d in data], [d["y"] for d in data])
+    if regions is not None:
+        save_regions(output_path, regions)
+    timings["写出 map_data.json"] = time.perf_counter() - start
+
+    # __depressJson.py：读取并解析，压缩后校验还原结果
+    start = time.perf_counter()
+    with open(output_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    blob = encode_map(json.loads(text), codec, text)
+    base_name, _ = os.path.splitext(output_path)
+    with open(f"{base_name}_compressed.hxm", "wb") as f:
+        f.write(blob)
+    decode_map_to_json(blob)
+    timings["压缩"] = time.perf_counter() - start
+
+    # __scanDataToPictrue.py：再次读取并解析，出图
+    start = time.perf_counter()
+    create_map_image(load_map_data(output_path), *preview_size).save(os.path.join(output_dir, DEFAULT_PREVIEW_NAME))
+    timings["渲染"] = time.perf_counter() - start
+    return timings
+
+
+def benchmark_pipeline(image_path, size_input="30*20", sampling_method=1, repeat=5, **options):
+    """
+    对比三脚本流程与进程内流水线：取样两者完全相同且最耗时，只执行一次，
+    之后在临时目录中分别重复执行取样之后的阶段，取最短耗时
+    :return: (取样耗时, 三脚本流程各阶段耗时, 流水线各阶段耗时)
+    """
+    data, _, scan_timings = scan_image(image_path, size_input, sampling_method)
+    temp_folder = tempfile.mkdtemp(prefix="__pipeline_")
+    try:
+        scripts, pipeline = [], []
+        for _ in range(repeat):
+            # 区域分析会原地修改单元格，每次使用取样结果的副本
+            scripts.append(run_script_workflow([dict(d) for d in data], output_dir=temp_folder, **options))
+            pipeline.append(finish_pipeline([dict(d) for d in data], output_dir=temp_folder, **options)["timings"])
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+    def best(runs):
+        return {stage: min(run[stage] for run in runs) for stage in runs[0]}
+    return sum(scan_timings.values()), best(scripts), best(pipeline)
+
+
+def print_timings(timings):
+    for stage, seconds in timings.items():
+        print(f"  {stage}: {seconds * 1000:.1f} ms")
+    print(f"  合计: {sum(timings.values()) * 1000:.1f} ms")
+
+
+def print_pipeline_benchmark(scan_seconds, scripts, pipeline):
+    print(f"\n取样（两者相同，只执行一次）: {scan_seconds * 1000:.1f} ms")
+    print("\n=== 三脚本流程（取样之后）===")
+    print_timings(scripts)
+    print("\n=== 进程内流水线（取样之后）===")
+    print_timings(pipeline)
+    total_scripts, total_pipeline = sum(scripts.values()), sum(pipeline.values())
+    print(f"\n取样之后: {total_scripts * 1000:.1f} ms => {total_pipeline * 1000:.1f} ms"
+          f"（{total_scripts / total_pipeline if total_pipeline else 0:.2f}x）")
+    print(f"含取样: {(scan_seconds + total_scripts) * 1000:.1f} ms => {(scan_seconds + total_pipeline) * 1000:.1f} ms")
+
+
+def main():
+    default_image_name = "temp_map.png"
+    image_name = input(f"[第1/6步] 请输入地图图片文件名（默认 {default_image_name}，直接回车使用默认值）：").strip()
+    image_name = image_name if image_name else default_image_name
+    if not os.path.exists(image_name):
+        print(f"图片文件 {image_name} 不存在！")
+        return
+
+    default_size = "30*20"
+    size_input = input(f"[第2/6步] 请输入尺寸（格式：(1, 宽度*高度) 或 (2, 宽度*高度)，默认 {default_size}）：").strip()
+    size_input = size_input if size_input else default_size
+
+    sampling_method = input("[第3/6步] 请输入取样方式（1: 网格内所有像素平均, 2: 网格中心点范围平均, 默认1）：").strip()
+    sampling_method = int(sampling_method) if sampling_method else 1
+
+    lake_max_size = parse_lake_input(input(f"[第4/6步] 是否进行区域分析（y 为封闭水域小于 {DEFAULT_LAKE_MAX_SIZE} 个单元格视为湖泊，"
+                                           f"也可直接输入该数值，默认 n 跳过）："))
+
+    codec = input(f"[第5/6步] 请选择编解码器（{', '.join(CODECS)}，默认 {DEFAULT_CODEC}）：").strip() or DEFAULT_CODEC
+
+    benchmark = input("[第6/6步] 是否与三脚本流程对比耗时（y/n，默认 n）：").strip().lower() == 'y'
+
+    options = {"lake_max_size": lake_max_size, "codec": codec}
+    if benchmark:
+        print_pipeline_benchmark(*benchmark_pipeline(image_name, size_input, sampling_method, **options))
+    else:
+        result = run_pipeline(image_name, size_input, sampling_method, show_stats=True, save_json=True, **options)
+        print_color_rules(result["color_rules"])
+        print("\n=== 耗时 ===")
+        print_timings(result["timings"])
+        print("\n=== 产物 ===")
+        for path in result["files"].values():
+            print(f"  {path}（{os.path.getsize(path)} 字节）")
+
+    input("\n已结束，回车可关闭窗口")
+
+
+if __name__ == "__main__":
+    main()
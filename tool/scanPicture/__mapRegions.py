@@ -0,0 +1,173 @@
+# pip install numpy # 本程序所需插件
+# ----------------------------------------
+# 地图连通区域分析（海洋 / 湖泊 / 大陆）
+# 在六边形邻接表上做向量化并查集（挂接 + 指针跳跃），每轮都是整数组操作，
+# 轮数约为 O(log n)，百万级单元格也能在线性时间量级内完成
+# ----------------------------------------
+import json
+import os
+
+import numpy as np
+
+from __hexTables import build_neighbors
+
+# 与 __scanPictureToMap.py 的 TERRAIN_TYPES 一致
+OCEAN = 0
+LAKE = 5
+WATER_TERRAINS = (OCEAN, LAKE)
+
+# 封闭水域小于该单元格数时视为湖泊
+DEFAULT_LAKE_MAX_SIZE = 64
+
+
+def label_components(neighbors, classes):
+    """
+    按邻接关系标记连通分量，只有类别相同的相邻单元格才连通
+    :param neighbors: 邻接表（count, 6），越界为 -1
+    :param classes: 每个单元格的类别（整数数组）
+    :return: 区域编号数组（0 ~ 区域数-1，按区域中第一个单元格的下标排序）
+    """
+    count = len(classes)
+    classes = np.asarray(classes)
+
+    # 六个方向两两相反，只取前三个方向即可覆盖每条无向边
+    src = np.repeat(np.arange(count, dtype=np.int64), 3)
+    dst = neighbors[:, :3].astype(np.int64).ravel()
+    valid = dst >= 0
+    src, dst = src[valid], dst[valid]
+    same = classes[src] == classes[dst]
+    src, dst = src[same], dst[same]
+
+    parent = np.arange(count, dtype=np.int64)
+    while src.size:
+        root_a = parent[src]
+        root_b = parent[dst]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        # 只保留仍跨越两个区域的边，后续轮次越来越少
+        src, dst = src[differ], dst[differ]
+        root_a, root_b = root_a[differ], root_b[differ]
+        # 挂接：较大的根指向较小的根，不会形成环
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        # 指针跳跃：压缩到根
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+    _, labels = np.unique(parent, return_inverse=True)
+    return labels.astype(np.int32)
+
+
+def analyze_regions(data, lake_max_size=DEFAULT_LAKE_MAX_SIZE, lake_height=None, neighbors=None):
+    """
+    区域分析：标记连通区域，将小于阈值且不接触地图边界的封闭水域改为湖泊
+    :param data: 单元格字典列表（需包含 x/y/terrain），会原地写入 region 字段并修改湖泊的 terrain
+    :param lake_max_size: 封闭水域小于该单元格数时视为湖泊
+    :param lake_height: 不为 None 时，改为湖泊的单元格同时设置该高度
+    :param neighbors: 预先生成的邻接表，为 None 时按 x/y 生成
+    :return: 区域表（列表，下标即区域编号）
+    """
+    if not data:
+        return []
+
+    xs = np.fromiter((d["x"] for d in data), dtype=np.int64, count=len(data))
+    ys = np.fromiter((d["y"] for d in data), dtype=np.int64, count=len(data))
+    terrains = np.fromiter((d["terrain"] for d in data), dtype=np.int64, count=len(data))
+    if neighbors is None:
+        neighbors = build_neighbors(xs, ys)
+
+    is_water = np.isin(terrains, WATER_TERRAINS)
+    labels = label_components(neighbors, is_water)
+    region_count = int(labels.max()) + 1
+
+    # 边界单元格：至少一个方向越界
+    has_neighbor = neighbors >= 0
+    on_border = ~has_neighbor.all(axis=1)
+    # 海岸单元格：至少一个邻居与自己水陆不同
+    neighbor_water = is_water[np.where(has_neighbor, neighbors, 0)]
+    is_coast = (has_neighbor & (neighbor_water != is_water[:, np.newaxis])).any(axis=1)
+
+    sizes = np.bincount(labels, minlength=region_count)
+    touches_border = np.bincount(labels, weights=on_border, minlength=region_count) > 0
+    region_water = np.zeros(region_count, dtype=bool)
+    region_water[labels] = is_water
+
+    min_x = np.full(region_count, np.iinfo(np.int64).max)
+    min_y = np.full(region_count, np.iinfo(np.int64).max)
+    max_x = np.full(region_count, np.iinfo(np.int64).min)
+    max_y = np.full(region_count, np.iinfo(np.int64).min)
+    np.minimum.at(min_x, labels, xs)
+    np.minimum.at(min_y, labels, ys)
+    np.maximum.at(max_x, labels, xs)
+    np.maximum.at(max_y, labels, ys)
+
+    # 封闭且较小的水域 => 湖泊
+    region_lake = region_water & ~touches_border & (sizes < lake_max_size)
+    to_lake = np.flatnonzero(region_lake[labels] & (terrains != LAKE))
+
+    # 按区域分组海岸单元格下标
+    coast_cells = np.flatnonzero(is_coast)
+    coast_cells = coast_cells[np.argsort(labels[coast_cells], kind="stable")]
+    coast_groups = np.split(coast_cells, np.cumsum(np.bincount(labels[coast_cells], minlength=region_count))[:-1])
+
+    for i, region in enumerate(labels.tolist()):
+        data[i]["region"] = region
+    for i in to_lake.tolist():
+        data[i]["terrain"] = LAKE
+        if lake_height is not None and "height" in data[i]:
+            data[i]["height"] = lake_height
+
+    regions = []
+    for region in range(region_count):
+        if region_lake[region]:
+            kind = "lake"
+        elif region_water[region]:
+            kind = "ocean"
+        else:
+            kind = "land"
+        regions.append({
+            "id": region,
+            "kind": kind,
+            "size": int(sizes[region]),
+            "bbox": [int(min_x[region]), int(min_y[region]), int(max_x[region]), int(max_y[region])],
+            "touchesBorder": bool(touches_border[region]),
+            "coastCells": coast_groups[region].tolist(),
+        })
+    return regions
+
+
+def save_regions(map_file, regions):
+    """在地图数据旁写入区域表（map_data.json => map_data_regions.json），返回文件路径"""
+    base_name, _ = os.path.splitext(map_file)
+    output_file = f"{base_name}_regions.json"
+    with open(output_file, "w") as f:
+        json.dump(regions, f, separators=(",", ":"))
+    return output_file
+
+
+def parse_lake_input(text):
+    """
+    解析“是否进行区域分析”的输入（区域分析会把小的封闭水域改为湖泊并给单元格加上 region 字段，默认不进行）
+    :param text: 空或 n 为跳过，y 为使用 DEFAULT_LAKE_MAX_SIZE，数字为封闭水域视为湖泊的最大单元格数
+    :return: 湖泊最大单元格数，跳过时为 None
+    """
+    text = text.strip().lower()
+    if text in ("", "n"):
+        return None
+    if text == "y":
+        return DEFAULT_LAKE_MAX_SIZE
+    return int(text)
+
+
+def print_regions(regions, top=10):
+    """打印区域统计（各类区域数量与最大的若干区域）"""
+    print("\n=== 区域分析 ===")
+    for kind, name in (("ocean", "海洋"), ("lake", "湖泊"), ("land", "大陆/岛屿")):
+        items = [r for r in regions if r["kind"] == kind]
+        print(f"{name}: {len(items)} 个，共 {sum(r['size'] for r in items)} 个单元格")
+    print(f"最大的 {min(top, len(regions))} 个区域:")
+    for r in sorted(regions, key=lambda r: r["size"], reverse=True)[:top]:
+        print(f"  #{r['id']} {r['kind']}: {r['size']} 个单元格, 包围盒 {r['bbox']}, 海岸 {len(r['coastCells'])} 个")
@@ -0,0 +1,306 @@
+# pip install pillow numpy tqdm opencv-python scikit-image scikit-learn # 本程序所需插件（同 __scanPictureToMap.py）
+# ----------------------------------------
+# 本地常驻转换服务（只监听 127.0.0.1，仅使用标准库 http.server）
+# 进程启动时一次性导入 skimage / sklearn 等库，颜色分类规则按图片内容缓存，
+# 设计师反复提交同一张图（或改动后的图）时省去解释器启动、导入和规则拟合的时间
+# 接口：
+#   POST /convert?size=30*20&method=1&type=1&lake=64&normalize=y&format=json&codec=col-zlib&preview=4*4
+#        请求体为图片文件的原始字节，例如：curl --data-binary @game_map.png "http://127.0.0.1:8765/convert?format=png"
+#        format: json（地图数据）/ png（预览图）/ hxm（列式压缩文件）
+#   GET  /stats  请求数、请求错误数（400）、内部错误数（500）、排队拒绝数、缓存命中数、p50/p95 延迟（毫秒）
+# ----------------------------------------
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, UnidentifiedImageError
+
+from __mapCodec import CODECS, DEFAULT_CODEC
+from __mapPipeline import DEFAULT_PREVIEW_SIZE, finish_pipeline, scan_image
+from __mapRegions import parse_lake_input
+from __scanPictureToMap import build_color_rules, compute_hex_size, parse_size_input
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8  # 正在执行与排队中的请求总数上限，超出时返回 503
+RULE_CACHE_SIZE = 32  # 缓存颜色分类规则的图片数
+LATENCY_WINDOW = 1000  # 计算延迟分位数时保留的最近请求数
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+
+RESPONSE_TYPES = {
+    "json": "application/json",
+    "png": "image/png",
+    "hxm": "application/octet-stream",
+}
+
+
+class RequestError(ValueError):
+    """请求本身有误（参数错误、无法识别的图片），回复 400；其他异常视为服务内部错误，回复 500"""
+
+
+class ColorRuleCache:
+    """按图片内容哈希缓存颜色分类规则（最近最少使用淘汰，线程安全）"""
+
+    def __init__(self, capacity=RULE_CACHE_SIZE):
+        self.capacity = capacity
+        self.rules = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, image):
+        with self.lock:
+            if key in self.rules:
+                self.rules.move_to_end(key)
+                self.hits += 1
+                return self.rules[key]
+            self.misses += 1
+        # 拟合较慢，不持有锁；同一张图同时提交时可能重复拟合一次，结果相同
+        rules = build_color_rules(image)
+        with self.lock:
+            self.rules[key] = rules
+            while len(self.rules) > self.capacity:
+                self.rules.popitem(last=False)
+        return rules
+
+
+class LatencyStats:
+    """记录请求结果与最近若干次请求的延迟"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bad_requests = 0
+        self.errors = 0
+        self.rejected = 0
+
+    def add(self, seconds, outcome="ok"):
+        """:param outcome: ok / bad_request（请求有误）/ error（内部错误）"""
+        with self.lock:
+            self.requests += 1
+            self.bad_requests += outcome == "bad_request"
+            self.errors += outcome == "error"
+            self.latencies.append(seconds)
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def percentile(self, values, ratio):
+        """最近秩法求分位数"""
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, max(0, int(round(ratio * len(values))) - 1))]
+
+    def summary(self):
+        with self.lock:
+            values = sorted(self.latencies)
+            return {
+                "requests": self.requests,
+                "bad_requests": self.bad_requests,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "p50_ms": round(self.percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(self.percentile(values, 0.95) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            }
+
+
+class MapService:
+    """转换服务：有界线程池 + 颜色规则缓存 + 延迟统计"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(max(workers, queue_size))
+        self.workers = workers
+        self.queue_size = max(workers, queue_size)
+        self.rule_cache = ColorRuleCache()
+        self.stats = LatencyStats()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def convert(self, body, params):
+        """
+        执行一次转换（在线程池中运行）
+        :param body: 图片文件字节
+        :param params: 查询参数字典（每个键取第一个值）
+        :return: (Content-Type, 响应字节)
+        """
+        output_format = params.get("format", "json")
+        if output_format not in RESPONSE_TYPES:
+            raise RequestError(f"未知的 format: {output_format}，可选: {', '.join(RESPONSE_TYPES)}")
+        codec = params.get("codec", DEFAULT_CODEC)
+        if codec not in CODECS:
+            raise RequestError(f"未知的 codec: {codec}，可选: {', '.join(CODECS)}")
+        # 参数与图片在处理之前全部解析完，之后出现的异常都属于服务内部错误
+        try:
+            preview_size = tuple(map(int, params["preview"].split("*"))) if "preview" in params else DEFAULT_PREVIEW_SIZE
+            lake_max_size = parse_lake_input(params.get("lake", "n"))
+            if len(preview_size) != 2 or min(preview_size) <= 0:
+                raise ValueError(f"preview 应为两个正整数（宽*高）: {params['preview']}")
+            sampling_type = int(params.get("type", 1))
+            if sampling_type not in (1, 2):
+                raise ValueError(f"type 只能为 1 或 2: {sampling_type}")
+            sampling_method = int(params.get("method", 1))
+            if sampling_method not in (1, 2):
+                raise ValueError(f"method 只能为 1 或 2: {sampling_method}")
+            size_input = params.get("size", "30*20")
+            size_type, width, height = parse_size_input(size_input)
+            if size_type not in (1, 2) or width <= 0 or height <= 0:
+                raise ValueError(f"无效的 size: {size_input}")
+        except ValueError as e:
+            raise RequestError(f"参数错误: {e}") from e
+        try:
+            image = Image.open(io.BytesIO(body)).convert("RGB")
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise RequestError(f"无法识别的图片: {e}") from e
+        hex_width, hex_height = compute_hex_size(image, size_type, width, height)
+        if not (0 < hex_width <= image.width and 0 < hex_height <= image.height):
+            raise RequestError(f"参数错误: size={size_input} 得到的网格尺寸 {hex_width}*{hex_height} "
+                               f"应大于 0 且不超过图片尺寸 {image.width}*{image.height}")
+
+        color_rules = self.rule_cache.get(hashlib.blake2b(body, digest_size=16).hexdigest(), image)
+        data, _, _ = scan_image(image, size_input, sampling_method, color_rules, sampling_type, progress=False)
+        result = finish_pipeline(
+            data,
+            sampling_type=sampling_type,
+            normalize_height=params.get("normalize", "y").lower() != "n",
+            lake_max_size=lake_max_size,
+            codec=codec if output_format == "hxm" else None,
+            preview_size=preview_size if output_format == "png" else None,
+            output_dir=None)
+
+        if output_format == "png":
+            buffer = io.BytesIO()
+            result["preview"].save(buffer, "PNG")
+            return RESPONSE_TYPES["png"], buffer.getvalue()
+        if output_format == "hxm":
+            return RESPONSE_TYPES["hxm"], result["blob"]
+        return RESPONSE_TYPES["json"], json.dumps(result["data"], separators=(",", ":")).encode("utf-8")
+
+    def submit(self, body, params):
+        """
+        提交到线程池并等待结果；正在执行与排队的请求已满时返回 None（调用方回复 503）
+        :return: (Content-Type, 响应字节) 或 None
+        """
+        if not self.slots.acquire(blocking=False):
+            self.stats.reject()
+            return None
+        with self.lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.executor.submit(self.convert, body, params).result()
+            outcome = "ok"
+            return response
+        except RequestError:
+            outcome = "bad_request"
+            raise
+        finally:
+            self.stats.add(time.perf_counter() - start, outcome)
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def summary(self):
+        stats = self.stats.summary()
+        with self.lock:
+            stats["in_flight"] = self.in_flight
+        stats["workers"] = self.workers
+        stats["queue_size"] = self.queue_size
+        stats["rule_cache"] = {"hits": self.rule_cache.hits, "misses": self.rule_cache.misses,
+                               "size": len(self.rule_cache.rules)}
+        return stats
+
+
+def make_handler(service):
+    """生成绑定到指定服务的请求处理类"""
+
+    class MapRequestHandler(BaseHTTPRequestHandler):
+        def send_bytes(self, status, content_type, payload):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def send_json(self, status, obj):
+            self.send_bytes(status, "application/json", json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/stats":
+                self.send_json(200, service.summary())
+            else:
+                self.send_json(404, {"error": "可用接口: POST /convert, GET /stats"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/convert":
+                self.send_json(404, {"error": "可用接口: POST /convert, GET /stats"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0 or length > MAX_UPLOAD_BYTES:
+                self.send_json(400, {"error": f"请求体应为图片文件字节（不超过 {MAX_UPLOAD_BYTES} 字节）"})
+                return
+            body = self.rfile.read(length)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                response = service.submit(body, params)
+            except RequestError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self.send_json(500, {"error": f"服务内部错误: {type(e).__name__}: {e}"})
+                return
+            if response is None:
+                self.send_json(503, {"error": "服务繁忙，请稍后重试"})
+                return
+            self.send_bytes(200, *response)
+
+        def log_message(self, format, *args):
+            # 默认每个请求打印一行到 stderr，与取样进度条混在一起，这里关闭
+            pass
+
+    return MapRequestHandler
+
+
+def create_server(port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """创建只监听本机的服务，返回 (server, service)"""
+    service = MapService(workers, queue_size)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(service))
+    server.daemon_threads = True
+    return server, service
+
+
+def main():
+    port = input(f"请输入端口（默认 {DEFAULT_PORT}）：").strip()
+    port = int(port) if port else DEFAULT_PORT
+    workers = input(f"请输入转换线程数（默认 {DEFAULT_WORKERS}）：").strip()
+    workers = int(workers) if workers else DEFAULT_WORKERS
+    queue_size = input(f"请输入最多同时处理与排队的请求数（默认 {DEFAULT_QUEUE_SIZE}）：").strip()
+    queue_size = int(queue_size) if queue_size else DEFAULT_QUEUE_SIZE
+
+    server, service = create_server(port, workers, queue_size)
+    print(f"转换服务已启动: http://127.0.0.1:{port}（POST /convert, GET /stats），按 Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.executor.shutdown(wait=False)
+    print("\n=== 统计 ===")
+    print(json.dumps(service.summary(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,24 +24,23 @@ def create_map_image(data, hex_width, hex_height):
     # 计算图片的宽度和高度
     max_x = max(d["x"] for d in data)
     max_y = max(d["y"] for d in data)
-    width = (max_x + 1) * hex_width
-    height = (max_y + 1) * hex_height
 
-    # 创建一个空白图片
-    image = Image.new("RGB", (width, height), (255, 255, 255))
-    pixels = image.load()
+    # 先按单元格生成一张小图（每个单元格一个像素，空白处为白色），再整体放大到网格尺寸
+    cells = np.full((max_y + 1, max_x + 1, 3), 255, dtype=np.uint8)
+    xs = np.fromiter((d["x"] for d in data), dtype=np.intp, count=len(data))
+    ys = np.fromiter((d["y"] for d in data), dtype=np.intp, count=len(data))
+    palette = np.zeros((max(TERRAIN_COLORS) + 1, 3), dtype=np.uint8)  # 未定义的地形默认黑色
+    for terrain, color in TERRAIN_COLORS.items():
+        palette[terrain] = color
+    terrains = np.fromiter((d["terrain"] for d in data), dtype=np.intp, count=len(data))
+    known = (terrains >= 0) & (terrains < len(palette))
+    colors = np.zeros((len(data), 3), dtype=np.uint8)
+    colors[known] = palette[terrains[known]]
+    cells[ys, xs] = colors
 
     # 填充每个六边形区域的颜色
-    for d in data:
-        x = d["x"] * hex_width
-        y = d["y"] * hex_height
-        terrain_color = TERRAIN_COLORS.get(d["terrain"], (0, 0, 0))  # 默认黑色
-        for i in range(x, x + hex_width):
-            for j in range(y, y + hex_height):
-                if i < width and j < height:
-                    pixels[i, j] = terrain_color
-
-    return image
+    pixels = np.repeat(np.repeat(cells, hex_height, axis=0), hex_width, axis=1)
+    return Image.fromarray(pixels, "RGB")
 
 def main():
     # 弹出命令行窗口，提示用户输入文件名
@@ -22,6 +22,9 @@ from skimage.feature import graycomatrix, graycoprops  # 用于纹理特征提
 from skimage.color import rgb2hsv  # 新增：用于RGB到HSV颜色空间转换
 from sklearn.cluster import KMeans  # 新增：用于颜色聚类分析
 from collections import defaultdict  # 新增：用于颜色分布统计
+from __hexTables import save_hex_tables  # 新增：用于输出六边形索引表与邻接表
+from __mapRegions import DEFAULT_LAKE_MAX_SIZE, analyze_regions, parse_lake_input, save_regions, print_regions  # 新增：用于连通区域分析
+from __scanDataToPictrue import create_map_image  # 新增：用于渐进式取样的预览图
 # ----------------------------------------
 
 # 定义地形类型
@@ -167,6 +170,31 @@ def get_terrain_type_by_color(color, color_rules):
         return TERRAIN_TYPES["LAKE"]
     else:
         return TERRAIN_TYPES["PLAIN"]  # 默认平原
+
+
+def get_terrain_types_by_color(colors, color_rules):
+    """
+    向量化版 get_terrain_type_by_color
+    :param colors: RGB颜色数组（N x 3，取值 0~255，按浮点处理，与 classify_cell 的平均色一致）
+    :return: 地形类型数组（N）
+    """
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    h, s, v = np.moveaxis(rgb2hsv(colors.reshape(-1, 1, 3)).reshape(-1, 3), 1, 0)
+    conditions, choices = [], []
+    for key, condition in (
+        ("OCEAN", (0.5 < h) & (h < 0.7) & (s > 0.2)),
+        ("PLAIN", s < 0.2),
+        ("HILL", (0.05 < h) & (h < 0.15) & (0.3 < v) & (v < 0.7)),
+        ("MOUNTAIN", ((0.9 < h) & (h < 1.0)) | ((0.0 < h) & (h < 0.05))),
+        ("HIGH_MOUNTAIN", (s > 0.5) & (v > 0.8)),
+        ("LAKE", (0.6 < h) & (h < 0.7) & (0.3 < s) & (s < 0.6)),
+    ):
+        if key in color_rules:
+            conditions.append(condition)
+            choices.append(TERRAIN_TYPES[key])
+    if not conditions:
+        return np.full(len(h), TERRAIN_TYPES["PLAIN"])
+    return np.select(conditions, choices, TERRAIN_TYPES["PLAIN"])
 # ----------------------------------------
 
 def get_terrain_type_by_texture(patch):
@@ -274,8 +302,48 @@ def normalize_heights(data):
     return data
 
 
-def sample_image(image, hex_width, hex_height, sampling_method, color_rules):
-    """对图片进行六边形网格取样"""
+# 新增方法：单个网格的取样与分类（从 sample_image 中提取，供渐进式取样复用）
+# ----------------------------------------
+def classify_cell(image, image_gray, x0, y0, x1, y1, sampling_method, color_rules, radius=5):
+    """
+    对一个网格取样并分类
+    :param image: PIL图像
+    :param image_gray: 灰度数组（用于纹理分析）
+    :param x0, y0, x1, y1: 网格在图像中的范围（左闭右开）
+    :param radius: 取样方式2的中心点取样半径（像素）
+    :return: 地形类型，网格内没有像素时返回 None
+    """
+    width, height = image.size
+    if sampling_method == 1:
+        # 取样方式1：网格内所有像素平均
+        pixels = []
+        for i in range(x0, x1):
+            for j in range(y0, y1):
+                if i < width and j < height:
+                    pixels.append(image.getpixel((i, j)))
+    else:
+        # 取样方式2：网格中心点的一定范围的所有像素平均
+        center_x = x0 + (x1 - x0) // 2
+        center_y = y0 + (y1 - y0) // 2
+        pixels = []
+        for i in range(center_x - radius, center_x + radius):
+            for j in range(center_y - radius, center_y + radius):
+                if i < width and j < height:
+                    pixels.append(image.getpixel((i, j)))
+    if not pixels:
+        return None
+    avg_color = np.mean(pixels, axis=0)
+
+    # 提取当前网格的灰度图像块
+    patch_gray = image_gray[y0:y1, x0:x1]
+
+    # 使用纹理和颜色协调分类
+    return get_terrain_type_by_texture_and_color(patch_gray, avg_color, color_rules)
+# ----------------------------------------
+
+
+def sample_image(image, hex_width, hex_height, sampling_method, color_rules, progress=True):
+    """对图片进行六边形网格取样（progress 为 False 时不显示进度条）"""
     width, height = image.size
     data = []
     index_x = 0
@@ -288,39 +356,15 @@ def sample_image(image, hex_width, hex_height, sampling_method, color_rules):
     image_gray = np.array(image.convert("L"))
 
     # 初始化进度条
-    with tqdm(total=total_cells, desc="取样进度", unit="cell") as pbar:
+    with tqdm(total=total_cells, desc="取样进度", unit="cell", disable=not progress) as pbar:
         start_time = time.time()  # 记录开始时间
 
         for y in range(0, height, hex_height):
             for x in range(0, width, hex_width):
-                if sampling_method == 1:
-                    # 取样方式1：网格内所有像素平均
-                    pixels = []
-                    for i in range(x, x + hex_width):
-                        for j in range(y, y + hex_height):
-                            if i < width and j < height:
-                                pixels.append(image.getpixel((i, j)))
-                    if pixels:
-                        avg_color = np.mean(pixels, axis=0)
-                else:
-                    # 取样方式2：网格中心点的一定范围的所有像素平均
-                    center_x = x + hex_width // 2
-                    center_y = y + hex_height // 2
-                    pixels = []
-                    for i in range(center_x - 5, center_x + 5):
-                        for j in range(center_y - 5, center_y + 5):
-                            if i < width and j < height:
-                                pixels.append(image.getpixel((i, j)))
-                    if pixels:
-                        avg_color = np.mean(pixels, axis=0)
-
-                if pixels:
-                    # 提取当前网格的灰度图像块
-                    patch_gray = image_gray[y:y + hex_height, x:x + hex_width]
-                    
-                    # 使用纹理和颜色协调分类
-                    terrain_type = get_terrain_type_by_texture_and_color(patch_gray, avg_color, color_rules)
-                    
+                terrain_type = classify_cell(image, image_gray, x, y, x + hex_width, y + hex_height,
+                                             sampling_method, color_rules)
+
+                if terrain_type is not None:
                     # 根据地形类型计算高度
                     height_level = get_height_by_terrain(terrain_type)
                     
@@ -354,6 +398,427 @@ def sample_image(image, hex_width, hex_height, sampling_method, color_rules):
     return data
 
 
+# 新增方法：渐进式取样（先粗后细）
+# ----------------------------------------
+# 第一级把多个网格合成一个“超级网格”，在缩小的图像上分类，很快得到整体的地形占比和预览；
+# 之后每级超级网格边长减半，只重新检查不确定的超级网格，其余沿用上一级的结果；
+# 最后一级（超级网格 = 单个网格）在原图上按 sample_image 的方式完整取样。
+# 超级网格的置信度按其自身的内容计算（而不是相邻网格的地形是否一致，那样误分类的超级网格内部永远不会被细化）：
+#   - 纹理特征随图像缩放和块大小变化，由纹理决定的地形（平均色不是海洋/湖泊）置信度为 0，必定细化；
+#     若超级网格内没有海洋/湖泊颜色的像素，其中的网格都只能由纹理决定，跳过中间级，直接留到最后一级完整取样
+#   - 由颜色决定的地形（海洋/湖泊），置信度 = 超级网格内颜色分类与该地形相同的像素占比，
+#     内部混有其他颜色（海岸、岛屿）时降低
+# 因此只有大片的海洋/湖泊能省去完整取样，但海洋网格的完整取样本来就很快（不计算纹理），加上各粗略级的开销，
+# 总耗时通常与 sample_image 相当甚至更长；用途是在完整取样结束前逐级看到地形占比和预览图，而不是加速。
+# 不确定度 = 1 - 置信度，大于容差的网格进入下一级；容差为 0 时只沿用颜色完全一致的海洋/湖泊超级网格，
+# 小于 0 时所有网格都完整取样，结果与 sample_image 相同
+PROGRESSIVE_MAX_COARSE_CELLS = 64  # 第一级最多分类的超级网格数
+PROGRESSIVE_PATCH_SIZE = 8  # 缩小后每个超级网格边长的目标像素数
+DEFAULT_PROGRESSIVE_TOLERANCE = 0.0
+COLOR_DECIDED_TERRAINS = (TERRAIN_TYPES["OCEAN"], TERRAIN_TYPES["LAKE"])  # 颜色分类优先于纹理分类的地形
+
+
+def super_cell_confidence(terrain_type, pixel_terrains):
+    """
+    超级网格的置信度
+    :param terrain_type: 超级网格的分类结果
+    :param pixel_terrains: 超级网格内每个像素的颜色分类（缩小后的图像）
+    :return: 0~1，越大说明其中的各个网格越可能与超级网格的分类相同
+    """
+    if terrain_type not in COLOR_DECIDED_TERRAINS or pixel_terrains.size == 0:
+        return 0.0
+    return float(np.mean(pixel_terrains == terrain_type))
+
+
+def progressive_sample_image(image, hex_width, hex_height, sampling_method, color_rules,
+                             tolerance=DEFAULT_PROGRESSIVE_TOLERANCE, on_level=None):
+    """
+    渐进式取样：先在缩小的图像上粗略分类，再逐级只细化不确定的超级网格
+    :param tolerance: 容差（0~1），不确定度大于容差的网格进入下一级
+    :param on_level: 每级结束后的回调 on_level(level_info, data)，可用于显示占比和预览
+    :return: 与 sample_image 相同格式的数据
+    """
+    width, height = image.size
+    cols = len(range(0, width, hex_width))
+    rows = len(range(0, height, hex_height))
+    labels = np.full((rows, cols), -1, dtype=np.int64)
+    confidence = np.zeros((rows, cols))  # 每个网格所在超级网格的置信度
+    sampled = np.zeros((rows, cols), dtype=bool)  # 已在原图上完整取样的网格
+    texture_only = np.zeros((rows, cols), dtype=bool)  # 只能由纹理决定、留到最后一级的网格
+
+    # 与 sample_image 一致：取样范围内没有像素的网格不输出（取样方式2的中心取样范围可能完全落在图像外）
+    has_pixels = np.ones((rows, cols), dtype=bool)
+    if sampling_method != 1:
+        has_pixels &= (np.arange(0, height, hex_height) + hex_height // 2 - 5 < height)[:, np.newaxis]
+        has_pixels &= np.arange(0, width, hex_width) + hex_width // 2 - 5 < width
+
+    # 第一级的超级网格边长（网格数，2 的幂）
+    block = 1
+    while ((rows + block - 1) // block) * ((cols + block - 1) // block) > PROGRESSIVE_MAX_COARSE_CELLS:
+        block *= 2
+
+    refine = has_pixels.copy()  # 需要重新分类的网格
+    level = 0
+    while True:
+        start_time = time.time()
+        # 缩小图像，使超级网格约为 PROGRESSIVE_PATCH_SIZE 像素；最后一级使用原图
+        factor = max(1, min(block * hex_width, block * hex_height) // PROGRESSIVE_PATCH_SIZE) if block > 1 else 1
+        # 中间级只处理可能由颜色决定的网格
+        pending = refine if block == 1 else refine & ~texture_only
+        classified = 0
+        if pending.any():
+            level_image = image.reduce(factor) if factor > 1 else image
+            level_gray = np.array(level_image.convert("L"))
+            if block > 1:
+                level_pixels = np.asarray(level_image)
+                pixel_terrains = get_terrain_types_by_color(level_pixels, color_rules).reshape(level_pixels.shape[:2])
+
+            for by in range(0, rows, block):
+                for bx in range(0, cols, block):
+                    if not pending[by:by + block, bx:bx + block].any():
+                        continue
+                    # 超级网格在缩小后图像中的范围；最后一级（factor = 1）与 sample_image 的取样范围完全相同
+                    x0, y0 = bx * hex_width // factor, by * hex_height // factor
+                    x1 = max(x0 + 1, min(cols, bx + block) * hex_width // factor)
+                    y1 = max(y0 + 1, min(rows, by + block) * hex_height // factor)
+                    cells = (slice(by, by + block), slice(bx, bx + block))
+                    if block == 1 or level == 0:
+                        terrain_type = classify_cell(level_image, level_gray, x0, y0, x1, y1,
+                                                     sampling_method, color_rules, max(1, 5 // factor))
+                        labels[cells] = -1 if terrain_type is None else terrain_type
+                    if block == 1:
+                        sampled[cells] = True
+                    else:
+                        # 粗略级只有颜色决定的结果会被沿用，按超级网格的平均色判断；纹理结果只用于第一级的预览，
+                        # 中间级不再计算，由纹理决定的超级网格保留第一级的结果
+                        region = pixel_terrains[y0:y1, x0:x1]
+                        color_type = get_terrain_type_by_color(level_pixels[y0:y1, x0:x1].reshape(-1, 3).mean(axis=0),
+                                                               color_rules)
+                        if color_type in COLOR_DECIDED_TERRAINS:
+                            labels[cells] = color_type
+                        confidence[cells] = super_cell_confidence(color_type, region)
+                        texture_only[cells] = not np.isin(region, COLOR_DECIDED_TERRAINS).any()
+                    classified += 1
+            # 超级网格的结果只写给有像素的网格
+            labels[~has_pixels] = -1
+
+        refine = (1 - confidence > tolerance) & ~sampled
+        level_info = {
+            "level": level,
+            "block": block,
+            "factor": factor,
+            "classified": classified,
+            "uncertain": int(refine.sum()),
+            "seconds": time.time() - start_time,
+        }
+        if on_level is not None:
+            on_level(level_info, labels_to_data(labels))
+        if block == 1 or not refine.any():
+            break
+        block //= 2
+        level += 1
+
+    return labels_to_data(labels)
+
+
+def labels_to_data(labels):
+    """将地形数组转换为 sample_image 格式的数据（跳过没有像素的网格）"""
+    data = []
+    for index_y, row in enumerate(labels.tolist()):
+        for index_x, terrain_type in enumerate(row):
+            if terrain_type >= 0:
+                data.append({
+                    "x": index_x,
+                    "y": index_y,
+                    "terrain": terrain_type,
+                    "height": get_height_by_terrain(terrain_type),
+                })
+    return data
+
+
+def print_progressive_level(level_info, data):
+    """打印一级渐进式取样的结果（地形占比）"""
+    total = len(data) or 1
+    counts = defaultdict(int)
+    for d in data:
+        counts[d["terrain"]] += 1
+    proportions = "，".join(f"{TERRAIN_NAMES.get(t, '未知')} {c / total * 100:.1f}%" for t, c in sorted(counts.items()))
+    print(f"[第{level_info['level'] + 1}级] 超级网格 {level_info['block']}x{level_info['block']}，图像缩小 {level_info['factor']} 倍，"
+          f"分类 {level_info['classified']} 次，不确定 {level_info['uncertain']} 个，"
+          f"耗时 {level_info['seconds']:.2f}s：{proportions}")
+# ----------------------------------------
+
+
+# 新增方法：向量化的多属性提取（取样种类 2：所有数据）
+# ----------------------------------------
+# 一次性对整张图按网格分块归约（块内求和、平方和、像素对统计），所有属性都由这些共享的中间结果计算，
+# 直接输出为类型化数组；新增一个属性只需在 ATTRIBUTE_CHANNELS 中加一项，基本不增加开销。
+# 地形分类与 classify_cell 的规则一致：颜色规则在块平均色上向量化执行，
+# 纹理特征（对比度、能量、相关性、同质性）由块内像素对直接求出，与 graycomatrix + graycoprops 等价
+GLCM_ANGLES = [0, 45, 90, 135]  # 与 get_terrain_type_by_texture 相同（graycomatrix 按弧度处理）
+DOMINANT_COLOR_BITS = 4  # 计算主色占比时每个通道保留的位数
+
+
+def _glcm_offsets(angles, distance=1):
+    """与 graycomatrix 相同的像素对偏移（行, 列）"""
+    return [(int(round(np.sin(angle) * distance)), int(round(np.cos(angle) * distance))) for angle in angles]
+
+
+class BlockReducer:
+    """按网格分块的共享中间结果（惰性计算并缓存），供各属性通道使用"""
+
+    def __init__(self, image, hex_width, hex_height, sampling_method, color_rules):
+        self.pixels = np.asarray(image, dtype=np.int64)
+        self.gray = np.array(image.convert("L"))
+        self.hex_width = hex_width
+        self.hex_height = hex_height
+        self.sampling_method = sampling_method
+        self.color_rules = color_rules
+        height, width = self.gray.shape
+        self.row_starts = np.arange(0, height, hex_height)
+        self.col_starts = np.arange(0, width, hex_width)
+        self.rows, self.cols = len(self.row_starts), len(self.col_starts)
+        # 每个像素所属的网格编号（行优先）
+        self.cell_ids = (np.arange(height) // hex_height)[:, np.newaxis] * self.cols + np.arange(width) // hex_width
+        self.cache = {}
+
+    def get(self, name):
+        """取中间结果或属性通道（首次使用时计算）"""
+        if name not in self.cache:
+            if name in ATTRIBUTE_CHANNELS:
+                self.cache[name] = ATTRIBUTE_CHANNELS[name][1](self)
+            else:
+                self.cache[name] = getattr(self, "_" + name)()
+        return self.cache[name]
+
+    def block_sum(self, values):
+        return np.add.reduceat(np.add.reduceat(values, self.row_starts, axis=0), self.col_starts, axis=1)
+
+    def _cell_counts(self):
+        """网格内的像素数"""
+        heights = np.diff(np.append(self.row_starts, self.gray.shape[0]))
+        widths = np.diff(np.append(self.col_starts, self.gray.shape[1]))
+        return np.outer(heights, widths).ravel()
+
+    def _cell_sums(self):
+        return self.block_sum(self.pixels).reshape(-1, 3)
+
+    def _sample_colors(self):
+        """取样颜色（与 classify_cell 相同），返回 (平均色, 有效掩码)"""
+        if self.sampling_method == 1:
+            return self.get("cell_sums") / self.get("cell_counts")[:, np.newaxis], np.ones(self.rows * self.cols, bool)
+        # 取样方式2：网格中心点 ±5 像素
+        height, width = self.gray.shape
+        window = np.arange(-5, 5)
+        xs = (self.col_starts + self.hex_width // 2)[:, np.newaxis] + window
+        ys = (self.row_starts + self.hex_height // 2)[:, np.newaxis] + window
+        valid_x, valid_y = xs < width, ys < height
+        gathered = self.pixels[np.where(valid_y, ys, 0)[:, np.newaxis, :, np.newaxis],
+                               np.where(valid_x, xs, 0)[np.newaxis, :, np.newaxis, :]]
+        weight = valid_y[:, np.newaxis, :, np.newaxis] & valid_x[np.newaxis, :, np.newaxis, :]
+        sums = (gathered * weight[..., np.newaxis]).sum(axis=(2, 3)).reshape(-1, 3)
+        counts = weight.sum(axis=(2, 3)).ravel()
+        return sums / np.maximum(counts, 1)[:, np.newaxis], counts > 0
+
+    def _color_terrain(self):
+        """颜色分类（向量化版 get_terrain_type_by_color）"""
+        colors, _ = self.get("sample_colors")
+        return get_terrain_types_by_color(colors, self.color_rules)
+
+    def _texture_props(self):
+        """每个网格的 (对比度, 能量, 相关性, 同质性)，各方向取平均（等价于对称、归一化的 GLCM）"""
+        count = self.rows * self.cols
+        height, width = self.gray.shape
+        gray = self.gray.astype(np.int64)
+        per_angle = []
+        for dr, dc in _glcm_offsets(np.asarray(GLCM_ANGLES, dtype=float)):
+            r0, r1 = max(0, -dr), height - max(0, dr)
+            c0, c1 = max(0, -dc), width - max(0, dc)
+            same = self.cell_ids[r0:r1, c0:c1] == self.cell_ids[r0 + dr:r1 + dr, c0 + dc:c1 + dc]
+            cells = self.cell_ids[r0:r1, c0:c1][same]
+            i = gray[r0:r1, c0:c1][same]
+            j = gray[r0 + dr:r1 + dr, c0 + dc:c1 + dc][same]
+
+            pairs = np.bincount(cells, minlength=count).astype(np.float64)
+            safe = np.maximum(pairs, 1)
+            diff2 = (i - j) ** 2
+            contrast = np.bincount(cells, diff2, count) / safe
+            homogeneity = np.bincount(cells, 1.0 / (1.0 + diff2), count) / safe
+
+            # 对称 GLCM：(i, j) 与 (j, i) 各计一次，两个边缘分布相同
+            mean = np.bincount(cells, i + j, count) / (2 * safe)
+            di, dj = i - mean[cells], j - mean[cells]
+            variance = np.bincount(cells, di * di + dj * dj, count) / (2 * safe)
+            covariance = np.bincount(cells, di * dj, count) / safe
+            std = np.sqrt(variance)
+            correlation = np.ones(count)
+            regular = std >= 1e-15
+            correlation[regular] = covariance[regular] / (std[regular] * std[regular])
+
+            # 能量：对称矩阵中非对角元素 (i, j)、(j, i) 各为无序计数 u，对角元素为 2 * 计数
+            low, high = np.minimum(i, j), np.maximum(i, j)
+            keys, counts = np.unique((cells * 256 + low) * 256 + high, return_counts=True)
+            diagonal = (keys // 256) % 256 == keys % 256
+            squares = np.where(diagonal, counts.astype(np.float64) ** 2, counts.astype(np.float64) ** 2 / 2)
+            energy = np.sqrt(np.bincount(keys // 65536, squares, count)) / safe
+
+            empty = pairs == 0
+            contrast[empty] = homogeneity[empty] = energy[empty] = 0
+            per_angle.append((contrast, energy, correlation, homogeneity))
+        return [np.stack([angle[k] for angle in per_angle], axis=1).mean(axis=1) for k in range(4)]
+
+    def _texture_terrain(self):
+        """纹理分类（向量化版 get_terrain_type_by_texture）"""
+        contrast, energy, correlation, homogeneity = self.get("texture_props")
+        return np.select([
+            (contrast > 0.5) & (energy < 0.2),
+            (contrast < 0.1) & (energy < 0.2),
+            (contrast < 0.2) & (energy > 0.5),
+            (correlation > 0.7) & (homogeneity > 0.6),
+            (0.3 < contrast) & (contrast < 0.5) & (0.3 < energy) & (energy < 0.5),
+        ], [
+            TERRAIN_TYPES["MOUNTAIN"],
+            TERRAIN_TYPES["OCEAN"],
+            TERRAIN_TYPES["PLAIN"],
+            TERRAIN_TYPES["LAKE"],
+            TERRAIN_TYPES["HILL"],
+        ], TERRAIN_TYPES["PLAIN"])
+
+
+def _channel_terrain(blocks):
+    # 与 get_terrain_type_by_texture_and_color 相同：颜色为海洋或湖泊时使用颜色结果，否则使用纹理结果
+    color = blocks.get("color_terrain")
+    keep_color = (color == TERRAIN_TYPES["OCEAN"]) | (color == TERRAIN_TYPES["LAKE"])
+    return np.where(keep_color, color, blocks.get("texture_terrain"))
+
+
+def _channel_height(blocks):
+    table = np.array([get_height_by_terrain(t) for t in range(max(TERRAIN_TYPES.values()) + 1)])
+    return table[blocks.get("terrain")]
+
+
+def _channel_humidity(blocks):
+    # 与 get_humidity_level 相同：int((g / 255) * 10)
+    colors, _ = blocks.get("sample_colors")
+    return ((colors[:, 1] / 255) * 10).astype(np.int64)
+
+
+def _channel_latitude(blocks):
+    # 与 get_latitude_level 相同：int((y / height) * 5)，y 为网格行号，height 为网格行数
+    rows = np.repeat(np.arange(blocks.rows), blocks.cols)
+    return ((rows / blocks.rows) * 5).astype(np.int64)
+
+
+def _channel_color_variance(blocks):
+    # 网格内各通道像素方差的平均值（置信度：越大说明网格内颜色越杂）
+    counts = blocks.get("cell_counts")[:, np.newaxis]
+    square_sums = blocks.block_sum(blocks.pixels * blocks.pixels).reshape(-1, 3)
+    means = blocks.get("cell_sums") / counts
+    return (square_sums / counts - means * means).mean(axis=1)
+
+
+def _channel_dominant_share(blocks):
+    # 网格内最常见颜色（每通道保留高 DOMINANT_COLOR_BITS 位）的像素占比（置信度：越大说明网格越纯）
+    shift = 8 - DOMINANT_COLOR_BITS
+    quantized = blocks.pixels >> shift
+    colors = (quantized[..., 0] << (2 * DOMINANT_COLOR_BITS)) | (quantized[..., 1] << DOMINANT_COLOR_BITS) | quantized[..., 2]
+    keys, counts = np.unique(blocks.cell_ids * (1 << (3 * DOMINANT_COLOR_BITS)) + colors, return_counts=True)
+    best = np.zeros(blocks.rows * blocks.cols, dtype=np.int64)
+    np.maximum.at(best, keys >> (3 * DOMINANT_COLOR_BITS), counts)
+    return best / blocks.get("cell_counts")
+
+
+# 属性通道：名称 => (输出类型, 计算函数)；按顺序计算，后面的通道可通过 blocks.get 使用前面的结果
+ATTRIBUTE_CHANNELS = {
+    "terrain": (np.int8, _channel_terrain),
+    "height": (np.uint8, _channel_height),
+    "humidity": (np.uint8, _channel_humidity),
+    "latitude": (np.uint8, _channel_latitude),
+    "color_variance": (np.float32, _channel_color_variance),
+    "dominant_share": (np.float32, _channel_dominant_share),
+}
+
+
+def extract_attributes(image, hex_width, hex_height, sampling_method, color_rules, channels=None):
+    """
+    一次分块归约计算所有属性
+    :param channels: 需要的通道名列表，为 None 时计算 ATTRIBUTE_CHANNELS 中的全部通道
+    :return: 字典：x / y（Int32）、valid（是否有取样像素）以及各通道的类型化数组，按行优先排列
+    """
+    blocks = BlockReducer(image, hex_width, hex_height, sampling_method, color_rules)
+    attributes = {
+        "x": np.tile(np.arange(blocks.cols, dtype=np.int32), blocks.rows),
+        "y": np.repeat(np.arange(blocks.rows, dtype=np.int32), blocks.cols),
+        "valid": blocks.get("sample_colors")[1],
+    }
+    for name in channels or ATTRIBUTE_CHANNELS:
+        attributes[name] = blocks.get(name).astype(ATTRIBUTE_CHANNELS[name][0])
+    return attributes
+
+
+def attributes_to_data(attributes, fields=("terrain", "humidity", "height", "latitude")):
+    """将属性数组转换为 sample_image 格式的单元格列表（跳过没有取样像素的网格）"""
+    valid = attributes["valid"]
+    columns = [("x", attributes["x"][valid]), ("y", attributes["y"][valid])]
+    columns += [(name, attributes[name][valid]) for name in fields]
+    names = [name for name, _ in columns]
+    return [dict(zip(names, values)) for values in zip(*(column.tolist() for _, column in columns))]
+
+
+def save_attributes(map_file, attributes):
+    """在地图数据旁写入属性数组（map_data.json => map_data_attributes.npz），返回文件路径"""
+    base_name, _ = os.path.splitext(map_file)
+    output_file = f"{base_name}_attributes.npz"
+    np.savez_compressed(output_file, **attributes)
+    return output_file
+# ----------------------------------------
+
+
+# 新增方法：可导入的处理步骤（供 main 与 __mapPipeline.py 共用，数据在内存中传递）
+# ----------------------------------------
+def build_color_rules(image):
+    """分析颜色分布并提取颜色分类规则"""
+    color_distribution = analyze_color_distribution(image)
+    return extract_color_features(color_distribution)
+
+
+def compute_hex_size(image, size_type, width, height):
+    """
+    根据尺寸类型计算六边形网格尺寸
+    :param size_type: 1: 地图单元格的横纵数量, 2: 六边形网格的尺寸
+    :return: (hex_width, hex_height)
+    """
+    if size_type == 1:
+        return image.width // width, image.height // height
+    return width, height
+
+
+def process_map_data(data, sampling_type=1, lake_max_size=None, normalize_height=True):
+    """
+    取样后的处理：按取样种类过滤字段、区域分析、填满高度
+    :param lake_max_size: 为 None 时跳过区域分析
+    :return: (处理后的数据, 区域表或 None)
+    """
+    # 根据取样种类过滤数据
+    if sampling_type == 1:
+        data = [{"x": d["x"], "y": d["y"], "terrain": d["terrain"], "height": d.get("height", 128)} for d in data]
+    else:
+        # 如果用户选择取样种类为 2（所有数据），则保留所有字段
+        pass
+
+    # 区域分析：在填满高度之前执行，以便湖泊使用湖泊高度参与映射
+    regions = None
+    if lake_max_size is not None:
+        regions = analyze_regions(data, lake_max_size, get_height_by_terrain(TERRAIN_TYPES["LAKE"]))
+
+    # 填满高度（仅在数据中包含 height 字段时执行）
+    if normalize_height:
+        data = normalize_heights(data)
+
+    return data, regions
+# ----------------------------------------
+
+
 def show_statistics(data):
     """显示统计信息"""
     total_cells = len(data)
@@ -454,7 +919,7 @@ def check_exit(user_input):
 def main():
     # 弹出命令行窗口，提示用户输入文件名
     default_image_name = "temp_map.png"
-    image_name = input(f"[第1/6步] 请输入地图图片文件名（默认 {default_image_name}，直接回车使用默认值）：")
+    image_name = input(f"[第1/8步] 请输入地图图片文件名（默认 {default_image_name}，直接回车使用默认值）：")
     check_exit(image_name)  # 检查是否退出
     image_name = image_name if image_name else default_image_name
 
@@ -467,15 +932,14 @@ def main():
     image = Image.open(image_name).convert("RGB")
 
     # 分析颜色分布并提取颜色分类规则
-    color_distribution = analyze_color_distribution(image)
-    color_rules = extract_color_features(color_distribution)
+    color_rules = build_color_rules(image)
 
     # 打印颜色分类规则
     print_color_rules(color_rules)
 
     # 提示用户选择尺寸
     default_size = "30*20"  # 默认尺寸
-    size_input = input(f"[第2/6步] 请输入尺寸（格式：(1, 宽度*高度) 或 (2, 宽度*高度)，默认 {default_size}，直接回车使用默认值）：")
+    size_input = input(f"[第2/8步] 请输入尺寸（格式：(1, 宽度*高度) 或 (2, 宽度*高度)，默认 {default_size}，直接回车使用默认值）：")
     check_exit(size_input)  # 检查是否退出
     size_input = size_input if size_input else default_size
 
@@ -483,27 +947,20 @@ def main():
     size_type, width, height = parse_size_input(size_input)
 
     # 根据尺寸类型计算六边形网格尺寸
-    if size_type == 1:
-        # 格式1：地图单元格的横纵数量
-        hex_width = image.width // width
-        hex_height = image.height // height
-    else:
-        # 格式2：六边形网格的尺寸
-        hex_width = width
-        hex_height = height
+    hex_width, hex_height = compute_hex_size(image, size_type, width, height)
 
     # 提示用户选择取样方式
-    sampling_method = input("[第3/6步] 请输入取样方式（1: 网格内所有像素平均, 2: 网格中心点范围平均, 默认1）：")
+    sampling_method = input("[第3/8步] 请输入取样方式（1: 网格内所有像素平均, 2: 网格中心点范围平均, 默认1）：")
     check_exit(sampling_method)
     sampling_method = int(sampling_method) if sampling_method else 1
 
     # 提示用户选择取样种类
-    sampling_type = input("[第4/6步] 请输入取样种类（1: 仅地形和高度数据, 2: 所有数据, 默认1）：")
+    sampling_type = input("[第4/8步] 请输入取样种类（1: 仅地形和高度数据, 2: 所有数据, 默认1）：")
     check_exit(sampling_type)
     sampling_type = int(sampling_type) if sampling_type else 1
 
     # 提示用户是否填满高度
-    fill_height = input("[第5/6步] 是否填满高度（y/n，默认 y）：")
+    fill_height = input("[第5/8步] 是否填满高度（y/n，默认 y）：")
     check_exit(fill_height)
     if fill_height.lower() != 'n':
         normalize_height = True
@@ -511,26 +968,54 @@ def main():
         normalize_height = False
 
     # 提示用户是否显示统计信息
-    show_stats = input("[第6/6步] 是否显示统计信息（y/n，默认 y）：")
+    show_stats = input("[第6/8步] 是否显示统计信息（y/n，默认 y）：")
     check_exit(show_stats)
     if show_stats.lower() != 'n':
         show_statistics_flag = True
     else:
         show_statistics_flag = False
 
-    # 取样
-    data = sample_image(image, hex_width, hex_height, sampling_method, color_rules)
+    # 提示用户是否进行区域分析
+    region_input = input(f"[第7/8步] 是否进行区域分析（识别湖泊并输出区域表，会修改地形并增加 region 字段；"
+                         f"y 为封闭水域小于 {DEFAULT_LAKE_MAX_SIZE} 个单元格视为湖泊，也可直接输入该数值，默认 n 跳过）：")
+    check_exit(region_input)
+    lake_max_size = parse_lake_input(region_input)
 
-    # 根据取样种类过滤数据
-    if sampling_type == 1:
-        data = [{"x": d["x"], "y": d["y"], "terrain": d["terrain"], "height": d.get("height", 128)} for d in data]
+    # 提示用户是否使用渐进式取样
+    progressive_input = input(f"[第8/8步] 是否使用渐进式取样（逐级输出地形占比和预览图，总耗时不会比直接取样更短；"
+                              f"输入容差 0~1，越小细化越多，y 为默认容差 {DEFAULT_PROGRESSIVE_TOLERANCE}，n 为关闭，默认 n）：")
+    check_exit(progressive_input)
+    if progressive_input.lower() in ('', 'n'):
+        tolerance = None
     else:
-        # 如果用户选择取样种类为 2（所有数据），则保留所有字段
-        pass
+        tolerance = float(progressive_input) if progressive_input.lower() != 'y' else DEFAULT_PROGRESSIVE_TOLERANCE
 
-    # 填满高度（仅在数据中包含 height 字段时执行）
-    if normalize_height:
-        data = normalize_heights(data)
+    # 取样
+    attributes = None
+    if sampling_type == 2:
+        # 所有数据：一次向量化分块归约得到地形、高度、湿度、纬度及置信度
+        if tolerance is not None:
+            print("取样种类为所有数据时使用向量化属性提取，已足够快，忽略渐进式取样。")
+        attributes = extract_attributes(image, hex_width, hex_height, sampling_method, color_rules)
+        data = attributes_to_data(attributes)
+    elif tolerance is None:
+        data = sample_image(image, hex_width, hex_height, sampling_method, color_rules)
+    else:
+        preview_path = "progressive_preview.png"
+
+        def on_level(level_info, level_data):
+            # 每级结束后显示地形占比并刷新预览图
+            print_progressive_level(level_info, level_data)
+            if level_data:
+                create_map_image(level_data, 4, 4).save(preview_path)
+
+        data = progressive_sample_image(image, hex_width, hex_height, sampling_method, color_rules, tolerance, on_level)
+        print(f"渐进式取样预览图已保存到 {preview_path}")
+
+    # 过滤字段、区域分析、填满高度
+    data, regions = process_map_data(data, sampling_type, lake_max_size, normalize_height)
+    if regions is not None:
+        print_regions(regions)
 
     # 显示统计信息
     if show_statistics_flag:
@@ -543,6 +1028,18 @@ def main():
 
     print(f"取样完成，结果已保存到 {output_path}")
 
+    # 输出六边形索引表与邻接表（x/y 即运行时的 q/r）
+    neighbors_path = save_hex_tables(output_path, [d["x"] for d in data], [d["y"] for d in data])
+    print(f"邻接表已保存到 {neighbors_path}")
+
+    if regions is not None:
+        regions_path = save_regions(output_path, regions)
+        print(f"区域表已保存到 {regions_path}")
+
+    if attributes is not None:
+        attributes_path = save_attributes(output_path, attributes)
+        print(f"属性数组（含颜色方差、主色占比）已保存到 {attributes_path}")
+
     input("已结束，回车可关闭窗口")
 # ----------------------------------------
 
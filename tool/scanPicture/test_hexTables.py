@@ -0,0 +1,65 @@
+# 运行：在本目录下执行 python -m pytest -q
+import numpy as np
+
+from __hexTables import (build_index_table, build_neighbors, decode_hex_tables, encode_hex_tables, generate_hex_grid,
+                         save_hex_tables, verify_against_reference)
+
+
+def test_index_table_round_trip():
+    qs, rs = generate_hex_grid(3, 3)
+    table, q_min, r_min, neighbors = decode_hex_tables(encode_hex_tables(qs, rs))
+    assert (q_min, r_min, table.shape) == (0, -1, (3, 4))
+    for i, (q, r) in enumerate(zip(qs.tolist(), rs.tolist())):
+        assert table[q - q_min, r - r_min] == i
+    assert (table >= 0).sum() == len(qs)
+    assert neighbors.tolist() == build_neighbors(qs, rs).tolist()
+
+
+def test_grid_order_matches_generate_hex_grid():
+    # q 外层，r 内层 [-(q >> 1), height - (q >> 1))
+    qs, rs = generate_hex_grid(3, 3)
+    assert list(zip(qs.tolist(), rs.tolist())) == [
+        (0, 0), (0, 1), (0, 2),
+        (1, 0), (1, 1), (1, 2),
+        (2, -1), (2, 0), (2, 1),
+    ]
+
+
+def test_neighbor_order_and_edge_sentinels():
+    # 方向顺序：[1,0], [1,-1], [0,-1], [-1,0], [-1,1], [0,1]；越界为 -1
+    qs, rs = generate_hex_grid(3, 3)
+    neighbors = build_neighbors(qs, rs)
+    assert neighbors.shape == (9, 6)
+    assert neighbors[4].tolist() == [8, 7, 3, 1, 2, 5]  # 中心 (1, 1) 六个邻居都存在
+    assert neighbors[0].tolist() == [3, -1, -1, -1, -1, 1]  # 角 (0, 0)
+    assert neighbors[6].tolist() == [-1, -1, -1, -1, 3, 7]  # 角 (2, -1)
+    # 邻接关系对称：A 的第 d 个邻居是 B，则 B 的第 (d + 3) % 6 个邻居是 A
+    for i, row in enumerate(neighbors.tolist()):
+        for d, j in enumerate(row):
+            if j >= 0:
+                assert neighbors[j, (d + 3) % 6] == i
+
+
+def test_sparse_cells():
+    # 缺少单元格时索引表对应位置为 -1，邻居指向缺失单元格时也为 -1
+    qs, rs = np.array([0, 0, 2]), np.array([0, 1, 0])
+    table, q_min, r_min = build_index_table(qs, rs)
+    assert table.tolist() == [[0, 1], [-1, -1], [2, -1]]
+    assert build_neighbors(qs, rs).tolist() == [
+        [-1, -1, -1, -1, -1, 1],
+        [-1, -1, 0, -1, -1, -1],
+        [-1, -1, -1, -1, -1, -1],
+    ]
+
+
+def test_save_hex_tables(tmp_path):
+    qs, rs = generate_hex_grid(3, 3)
+    output_file = save_hex_tables(str(tmp_path / "map_data.json"), qs.tolist(), rs.tolist())
+    assert output_file == str(tmp_path / "map_data_neighbors.bin")
+    with open(output_file, "rb") as f:
+        assert f.read() == encode_hex_tables(qs, rs)
+
+
+def test_matches_reference_implementation():
+    for width, height in [(1, 1), (2, 3), (3, 3), (5, 4), (20, 20), (33, 17)]:
+        assert verify_against_reference(width, height)
@@ -0,0 +1,19 @@
+# 运行：在本目录下执行 python -m pytest -q
+import pytest
+from PIL import Image
+
+from __scanPictureToMap import build_color_rules, compute_hex_size, progressive_sample_image, sample_image
+
+MAPS = ["chinese_map.png", "earth_map.png", "euroup_map.png", "game_map.png"]
+
+
+@pytest.mark.parametrize("sampling_method", [1, 2])
+@pytest.mark.parametrize("map_file", MAPS)
+def test_progressive_matches_sample_image(map_file, sampling_method):
+    # 20*12 时各地图最右列/最下行网格的中心取样范围落在图像外，sample_image 不输出这些网格，
+    # 而它们所在的超级网格在粗略级就被判为海洋
+    image = Image.open(map_file).convert("RGB")
+    color_rules = build_color_rules(image.reduce(4))  # 两种取样使用同一组规则即可，在缩小的图像上统计更快
+    hex_width, hex_height = compute_hex_size(image, 1, 20, 12)
+    expected = sample_image(image, hex_width, hex_height, sampling_method, color_rules)
+    assert progressive_sample_image(image, hex_width, hex_height, sampling_method, color_rules, 0.0) == expected